@@ -0,0 +1,23 @@
+import hmac
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+
+def token_required(f):
+    """
+    Requires a bearer token from API_TOKENS, unless authentication is off
+    """
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if current_app.config.get("AUTHENTICATION_ON", False):
+            scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+            tokens = current_app.config.get("API_TOKENS", [])
+            if scheme.lower() != "bearer" or not any(
+                hmac.compare_digest(token.encode(), t.encode()) for t in tokens
+            ):
+                return jsonify({"error": "A valid API token is required"}), 401
+        return f(*args, **kwargs)
+
+    return decorated
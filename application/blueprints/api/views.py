@@ -0,0 +1,206 @@
+import json
+
+import orjson
+from flask import Blueprint, Response, jsonify, request, stream_with_context, url_for
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import load_only
+
+from application.blueprints.api.utils import token_required
+from application.blueprints.dataset.ingest import BATCH_SIZE, RecordIngest
+from application.database.models import Dataset, Record, RecordChange
+from application.database.serialise import record_serialiser
+
+api = Blueprint("api", __name__)
+
+MAX_BATCH_SIZE = 5000
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_CHANGES_SIZE = 1000
+MAX_CHANGES_SIZE = 10000
+
+
+@api.route("/dataset/<string:dataset>/records.json")
+def records_json(dataset):
+    ds = Dataset.query.get(dataset)
+    if ds is None:
+        return jsonify({"error": f"Dataset {dataset} not found"}), 404
+
+    dataset_fields = [field.field for field in ds.ordered_fields()]
+    requested = request.args.get("fields")
+    if requested:
+        fields = [field.strip() for field in requested.split(",") if field.strip()]
+        unknown = [field for field in fields if field not in dataset_fields]
+        if unknown:
+            return (
+                jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}),
+                400,
+            )
+    else:
+        fields = dataset_fields
+    limit = min(
+        max(request.args.get("limit", DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE
+    )
+    after = request.args.get("after", type=int)
+    include = request.args.get("include", "")
+    include_related = "related_records" in include.split(",")
+
+    # fields named after a child dataset hold the reference of the related record
+    child_fields = [child.dataset for child in ds.children if child.dataset in fields]
+    serialise = record_serialiser(
+        tuple(field for field in fields if field not in child_fields)
+    )
+
+    query = Record.query.filter(Record.dataset_id == ds.dataset)
+    if after is not None:
+        query = query.filter(Record.entity > after)
+    records = (
+        query.options(
+            load_only(*[getattr(Record, column) for column in serialise.columns])
+        )
+        .order_by(Record.entity)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(records) > limit
+    records = records[:limit]
+
+    related = {}
+    if records and (include_related or child_fields):
+        for r in (
+            Record.query.filter(
+                Record.owning_record_dataset == ds.dataset,
+                Record.owning_record_entity.in_([record.entity for record in records]),
+            )
+            .options(
+                load_only(
+                    Record.entity,
+                    Record.dataset_id,
+                    Record.reference,
+                    Record.owning_record_entity,
+                )
+            )
+            .order_by(Record.dataset_id, Record.entity)
+        ):
+            related.setdefault(r.owning_record_entity, []).append(r)
+
+    items = []
+    for record in records:
+        item = serialise(record)
+        for field in child_fields:
+            item[field] = None
+        for r in related.get(record.entity, []):
+            if r.dataset_id in child_fields:
+                item[r.dataset_id] = r.reference
+        if include_related:
+            item["related_records"] = [
+                {"dataset": r.dataset_id, "entity": r.entity, "reference": r.reference}
+                for r in related.get(record.entity, [])
+            ]
+        items.append(item)
+
+    next_url = None
+    if has_more:
+        args = {"dataset": ds.dataset, "after": records[-1].entity, "limit": limit}
+        if requested:
+            args["fields"] = requested
+        if include:
+            args["include"] = include
+        next_url = url_for("api.records_json", **args)
+
+    body = {"dataset": ds.dataset, "records": items, "next": next_url}
+    return Response(orjson.dumps(body), mimetype="application/json")
+
+
+@api.route("/dataset/<string:dataset>/records.ndjson", methods=["POST"])
+@token_required
+def ingest_records(dataset):
+    ds = Dataset.query.get(dataset)
+    if ds is None:
+        return jsonify({"error": f"Dataset {dataset} not found"}), 404
+    batch_size = min(
+        max(request.args.get("batch_size", BATCH_SIZE, type=int), 1), MAX_BATCH_SIZE
+    )
+    stream = request.stream
+
+    def rows():
+        for line, raw in enumerate(stream, start=1):
+            if not raw.strip():
+                continue
+            try:
+                data = json.loads(raw)
+            except ValueError as e:
+                yield line, ValueError(f"Line is not valid json: {e}")
+                continue
+            if not isinstance(data, dict):
+                yield line, ValueError("Line must be a json object")
+                continue
+            yield line, data
+
+    def generate():
+        # the request's session is closed before a streamed response is sent,
+        # so the dataset is loaded again in the one the stream uses
+        ingest = RecordIngest(Dataset.query.get(dataset), batch_size=batch_size)
+        for result in ingest.ingest(rows()):
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"summary": ingest.counts}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@api.route("/changes.ndjson")
+@token_required
+def changes():
+    since = request.args.get("since", "0")
+    try:
+        position = _change_position(since)
+    except ValueError:
+        return jsonify({"error": f"Invalid cursor {since}"}), 400
+    limit = min(
+        max(request.args.get("limit", DEFAULT_CHANGES_SIZE, type=int), 1),
+        MAX_CHANGES_SIZE,
+    )
+    dataset = request.args.get("dataset")
+
+    def generate():
+        cursor = since
+        query = _changes_query(position, dataset, limit)
+        for change in query.yield_per(DEFAULT_CHANGES_SIZE):
+            cursor = f"{change.txid}-{change.id}"
+            yield orjson.dumps(
+                {
+                    "id": change.id,
+                    "dataset": change.dataset_id,
+                    "entity": change.entity,
+                    "operation": change.operation,
+                    "changed_at": change.changed_at,
+                    "record": change.data,
+                }
+            ) + b"\n"
+        # the last line is the cursor to pass as since for the next request
+        yield orjson.dumps({"cursor": cursor}) + b"\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def _changes_query(position, dataset, limit):
+    # change ids are taken before their transactions commit, so a change
+    # with a lower id can commit after one with a higher id. Changes are
+    # read in transaction order instead, and only from transactions older
+    # than any still running, so none can commit behind the cursor later.
+    oldest_running = select(
+        func.txid_snapshot_xmin(func.txid_current_snapshot())
+    ).scalar_subquery()
+    query = RecordChange.query.filter(RecordChange.txid < oldest_running)
+    if position is not None:
+        query = query.filter(tuple_(RecordChange.txid, RecordChange.id) > position)
+    if dataset:
+        query = query.filter(RecordChange.dataset_id == dataset)
+    return query.order_by(RecordChange.txid, RecordChange.id).limit(limit)
+
+
+def _change_position(since):
+    # cursors are "<txid>-<id>", 0 is the start of the log
+    if since == "0":
+        return None
+    txid, _, change_id = since.partition("-")
+    return int(txid), int(change_id)
@@ -0,0 +1,163 @@
+import re
+
+from sqlalchemy import Text, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+from application.database.changes import record_change
+from application.database.models import Organisation, Record, record_version_seq
+from application.database.serialise import RECORD_COLUMNS
+from application.extensions import db
+from application.validation.models import RecordModel
+
+# fields that identify a record or are set by the application
+READ_ONLY_FIELDS = {"entity", "prefix", "reference", "entry-date", "end-date"}
+DATE_PATTERN = re.compile(r"^\d{4}(-\d{2}(-\d{2})?)?$")
+DATE_COLUMNS = {"entry_date", "start_date", "end_date"}
+
+# records read back at a time to write the change log
+CHANGE_LOG_BATCH_SIZE = 1000
+
+
+class BulkEditError(ValueError):
+    pass
+
+
+def editable_fields(dataset):
+    return [
+        field
+        for field in dataset.ordered_fields()
+        if field.field not in READ_ONLY_FIELDS
+    ]
+
+
+class BulkEdit:
+    """
+    Sets or clears one field on every active record in a dataset that has
+    a given value in another field.
+
+    The new value is validated once, then applied to all matching records
+    with a single UPDATE: data fields are written with jsonb_set or removed
+    with the - operator, and fields held in their own column are set
+    directly. The change log is written for the updated entities afterwards
+    in the same transaction.
+    """
+
+    def __init__(self, dataset, filter_field, filter_value, field, value=None):
+        self.dataset = dataset
+        self.filter_field = filter_field
+        self.filter_value = (filter_value or "").strip()
+        self.field = field
+        self.value = value.strip() if value else None
+
+    def count(self):
+        return db.session.execute(
+            select(func.count()).select_from(Record).where(*self._criteria())
+        ).scalar()
+
+    def validate(self):
+        if self.filter_field and self.filter_field not in {
+            field.field for field in self.dataset.fields
+        }:
+            raise BulkEditError(f"{self.filter_field} is not a field of this dataset")
+        fields = {field.field: field for field in editable_fields(self.dataset)}
+        field = fields.get(self.field)
+        if field is None:
+            raise BulkEditError(f"{self.field} can't be edited in bulk")
+        if self.value is None:
+            return
+        if self.field == "organisation":
+            if db.session.get(Organisation, self.value) is None:
+                raise BulkEditError(f"Organisation '{self.value}' not found")
+        elif self.field == "organisations":
+            for organisation in self.value.split(";"):
+                if db.session.get(Organisation, organisation) is None:
+                    raise BulkEditError(f"Organisation '{organisation}' not found")
+        elif field.datatype == "datetime":
+            if not DATE_PATTERN.match(self.value):
+                raise BulkEditError(f"{self.field} must be a date like 2024-01-31")
+            # date columns can't hold a partial date the way data can
+            if self._column_name() in DATE_COLUMNS and len(self.value) != 10:
+                raise BulkEditError(f"{self.field} must be a full date like 2024-01-31")
+        else:
+            # checks the field belongs to the dataset and any reference exists
+            RecordModel.from_data({self.field: self.value}, self.dataset.fields)
+
+    def apply(self):
+        self.validate()
+        stmt = (
+            update(Record)
+            .where(*self._criteria())
+            .values(
+                {
+                    self._column_name(): self._new_value(),
+                    "version": record_version_seq.next_value(),
+                }
+            )
+            .returning(Record.entity)
+            .execution_options(synchronize_session=False)
+        )
+        entities = list(db.session.execute(stmt).scalars())
+        self._log_changes(entities)
+        db.session.commit()
+        return len(entities)
+
+    def _criteria(self):
+        criteria = [
+            Record.dataset_id == self.dataset.dataset,
+            Record.end_date.is_(None),
+        ]
+        if self.filter_field == "organisations":
+            if self.filter_value:
+                criteria.append(Record.organisation_ids.any(self.filter_value))
+            else:
+                criteria.append(Record.organisation_ids.is_(None))
+        elif self.filter_field:
+            column = _column(self.filter_field)
+            if self.filter_value:
+                criteria.append(column == self.filter_value)
+            else:
+                criteria.append(or_(column.is_(None), column == ""))
+        return criteria
+
+    def _column_name(self):
+        if self.field == "organisation":
+            return "organisation_id"
+        if self.field == "organisations":
+            return "organisation_ids"
+        attr = self.field.replace("-", "_")
+        return attr if attr in RECORD_COLUMNS else "data"
+
+    def _new_value(self):
+        column = self._column_name()
+        if column == "organisation_ids":
+            return self.value.split(";") if self.value else None
+        if column != "data":
+            return self.value
+        if self.value is None:
+            return Record.data.op("-")(literal(self.field, Text))
+        return func.jsonb_set(
+            func.coalesce(Record.data, literal({}, JSONB)),
+            literal([self.field], ARRAY(Text)),
+            literal(self.value, JSONB),
+        )
+
+    def _log_changes(self, entities):
+        # read back only the updated records, a batch at a time
+        for i in range(0, len(entities), CHANGE_LOG_BATCH_SIZE):
+            records = Record.query.filter(
+                Record.dataset_id == self.dataset.dataset,
+                Record.entity.in_(entities[i : i + CHANGE_LOG_BATCH_SIZE]),
+            ).populate_existing()
+            db.session.add_all(
+                record_change(db.session, record, "update") for record in records
+            )
+            db.session.flush()
+
+
+def _column(field):
+    if field == "organisation":
+        return Record.organisation_id
+    attr = field.replace("-", "_")
+    if attr in RECORD_COLUMNS:
+        return getattr(Record, attr)
+    return Record.data[field].astext
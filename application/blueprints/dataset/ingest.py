@@ -0,0 +1,270 @@
+import csv
+import io
+from itertools import islice
+
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+
+from application.blueprints.dataset.utils import (
+    create_record,
+    entity_allocator,
+    update_record,
+)
+from application.database.models import Record
+from application.extensions import db
+from application.validation.models import RecordModel, batch_context
+
+BATCH_SIZE = 500
+
+# rows with errors listed back after an upload, the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+# the same fields the add and edit forms leave out of a record's data
+SKIP_FIELDS = {"entity", "prefix", "entry-date", "start-date", "end-date", "reference"}
+
+
+class RecordIngest:
+    """
+    Validates and writes records for one dataset in fixed size batches.
+
+    Rows are (line, data) pairs read lazily from the caller, so only one
+    batch is held in memory at a time. Each batch is validated against
+    references loaded in one go, gets its new entity ids in one block and is
+    committed in its own transaction. A row with an entity or a reference
+    matching an existing record updates it, otherwise a new record is made.
+    Child records are linked to their owning record by the reference held
+    in the field named after the parent dataset, or in owning_record.
+
+    ingest() yields a result dict for every row as each batch is committed.
+    A row whose data is an exception is reported as failed with its message,
+    and every valid row in a batch that can't be saved, or that there are
+    no entity ids left for, is reported as failed with the reason.
+    """
+
+    def __init__(self, dataset, batch_size=BATCH_SIZE):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.counts = {"created": 0, "updated": 0, "failed": 0}
+
+    def ingest(self, rows):
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            yield from self._ingest_batch(batch)
+
+    def _ingest_batch(self, batch):
+        results = []
+        rows = []
+        for line, data in batch:
+            result = {"line": line, "status": "failed", "errors": []}
+            results.append(result)
+            # rows that couldn't be read are passed in as the exception
+            if isinstance(data, Exception):
+                result["errors"].append(str(data))
+                continue
+            data = dict(data)
+            owning_reference = data.pop("owning_record", None)
+            if owning_reference is None and self.dataset.parent is not None:
+                owning_reference = data.get(self.dataset.parent)
+            if isinstance(data.get("organisations"), list):
+                data["organisations"] = ";".join(data["organisations"])
+            rows.append(
+                {
+                    "line": line,
+                    "result": result,
+                    "entity": _to_entity(data.pop("entity", None)),
+                    "reference": data.pop("reference", None) or None,
+                    "owning_reference": owning_reference or None,
+                    "data": {k: v for k, v in data.items() if k not in SKIP_FIELDS},
+                }
+            )
+
+        context = batch_context(self.dataset, [row["data"] for row in rows])
+        existing = self._existing_records(rows)
+        owning_records = self._owning_records(rows)
+
+        valid = []
+        for row in rows:
+            result = row["result"]
+            if self.dataset.parent is not None:
+                if row["owning_reference"] is None:
+                    result["errors"].append(
+                        f"A {self.dataset.parent} reference is needed to link this record"
+                    )
+                    continue
+                if row["owning_reference"] not in owning_records:
+                    result["errors"].append(
+                        f"Reference '{row['owning_reference']}' not found in dataset "
+                        f"'{self.dataset.parent}'"
+                    )
+                    continue
+            if row["entity"] is not None and not isinstance(row["entity"], int):
+                result["errors"].append(f"Entity '{row['entity']}' is not a number")
+                continue
+            if row["entity"] is not None and row["entity"] not in existing["entity"]:
+                result["errors"].append(
+                    f"Entity {row['entity']} not found in dataset '{self.dataset.dataset}'"
+                )
+                continue
+            try:
+                model = RecordModel.from_data(
+                    row["data"], self.dataset.fields, context=context
+                )
+            except ValidationError as e:
+                result["errors"].extend(_error_messages(e))
+                continue
+            except ValueError as e:
+                result["errors"].append(str(e))
+                continue
+            valid.append(
+                (row, result, model.model_dump(by_alias=True, exclude={"fields": True}))
+            )
+
+        new_rows = [
+            (row, result, data)
+            for row, result, data in valid
+            if _find_existing(row, existing) is None
+        ]
+        try:
+            entities = iter(entity_allocator.allocate(self.dataset, len(new_rows)))
+            for row, result, validated_data in valid:
+                record = _find_existing(row, existing)
+                if record is None:
+                    record = create_record(
+                        next(entities),
+                        validated_data,
+                        self.dataset,
+                        reference=row["reference"],
+                    )
+                    result["status"] = "created"
+                else:
+                    record = update_record(validated_data, record)
+                    result["status"] = "updated"
+                if (
+                    row["owning_reference"] is not None
+                    and record.owning_record_entity is None
+                ):
+                    record.owning_record = owning_records.get(row["owning_reference"])
+                result["entity"] = record.entity
+                result["reference"] = record.reference
+                db.session.add(record)
+            db.session.commit()
+        except (SQLAlchemyError, ValueError) as e:
+            db.session.rollback()
+            # a ValueError is the dataset running out of entity ids
+            reason = str(e) if isinstance(e, ValueError) else e.__class__.__name__
+            for _, result, _ in valid:
+                result["status"] = "failed"
+                result["errors"].append(f"Batch could not be saved: {reason}")
+                result.pop("entity", None)
+                result.pop("reference", None)
+
+        for result in results:
+            self.counts[result["status"]] += 1
+        return results
+
+    def _existing_records(self, rows):
+        entities = {row["entity"] for row in rows if isinstance(row["entity"], int)}
+        references = {
+            row["reference"]
+            for row in rows
+            if row["entity"] is None and row["reference"] is not None
+        }
+        existing = {"entity": {}, "reference": {}}
+        if entities:
+            for record in Record.query.filter(
+                Record.dataset_id == self.dataset.dataset, Record.entity.in_(entities)
+            ):
+                existing["entity"][record.entity] = record
+        if references:
+            for record in Record.query.filter(
+                Record.dataset_id == self.dataset.dataset,
+                Record.reference.in_(references),
+            ):
+                existing["reference"][record.reference] = record
+        return existing
+
+    def _owning_records(self, rows):
+        references = {
+            row["owning_reference"]
+            for row in rows
+            if row["owning_reference"] is not None
+        }
+        if self.dataset.parent is None or not references:
+            return {}
+        return {
+            record.reference: record
+            for record in Record.query.filter(
+                Record.dataset_id == self.dataset.parent,
+                Record.reference.in_(references),
+            )
+        }
+
+
+def _find_existing(row, existing):
+    if row["entity"] is not None:
+        return existing["entity"].get(row["entity"])
+    if row["reference"] is not None:
+        return existing["reference"].get(row["reference"])
+    return None
+
+
+def _to_entity(value):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _error_messages(e):
+    messages = []
+    for error in e.errors():
+        location = ".".join(str(part) for part in error["loc"])
+        messages.append(f"{location}: {error['msg']}" if location else error["msg"])
+    return messages
+
+
+def map_columns(headers, fields):
+    """
+    Match csv column headings to dataset fields, by field or field name,
+    ignoring case, spaces and underscores
+    """
+    lookup = {}
+    for field in fields:
+        lookup[_normalise(field.field)] = field.field
+        if field.name:
+            lookup[_normalise(field.name)] = field.field
+    lookup["owning-record"] = "owning_record"
+    columns = {}
+    unmatched = []
+    for header in headers or []:
+        field = lookup.get(_normalise(header))
+        if field is None:
+            unmatched.append(header)
+        else:
+            columns[header] = field
+    return columns, unmatched
+
+
+def read_csv(stream, fields):
+    """
+    Returns the matched and unmatched columns of a csv file stream and a
+    generator of (line, data) rows, decoded as the file is read
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    columns, unmatched = map_columns(reader.fieldnames, fields)
+
+    def rows():
+        for row in reader:
+            data = {field: row.get(header) for header, field in columns.items()}
+            yield reader.line_num, data
+
+    return columns, unmatched, rows()
+
+
+def _normalise(name):
+    return name.strip().lower().replace("_", "-").replace(" ", "-")
@@ -1,13 +1,151 @@
+import logging
+import threading
+from collections import deque
+
 from sqlalchemy import text
 
 from application.database.models import Organisation, Record
 from application.extensions import db
 
+logger = logging.getLogger(__name__)
+
+ENTITY_BLOCK_SIZE = 20
+# single records take a block of ids only while more than this many are left,
+# after that they take one id at a time so none are lost in a worker's pool
+ENTITY_POOL_MINIMUM = 1000
+# warn once less than this fraction of a dataset's entity range is left
+ENTITY_HEADROOM_WARNING = 0.1
+
+
+def entity_sequence_name(dataset_name):
+    return f"{dataset_name.replace('-', '_')}_entity_seq"
+
+
+class EntityAllocator:
+    """
+    Hands out entity ids from blocks reserved from each dataset's sequence.
+
+    A block is reserved with a single nextval over generate_series, and any
+    ids not needed straight away are kept in a pool for this worker. Ids in
+    the pool are lost if the worker stops, so the block size for single
+    records is kept small, and near the end of a dataset's range single
+    records take one id at a time. Bulk callers ask for exactly what they
+    need.
+    """
+
+    def __init__(self, block_size=ENTITY_BLOCK_SIZE):
+        self.block_size = block_size
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def next(self, dataset):
+        return self.allocate(dataset, 1)[0]
+
+    def allocate(self, dataset, count):
+        with self._lock:
+            pool = self._pools.setdefault(dataset.dataset, deque())
+            shortfall = count - len(pool)
+            if shortfall > 0:
+                size = shortfall
+                if count == 1:
+                    remaining = remaining_entities(dataset)
+                    if remaining is None or remaining > ENTITY_POOL_MINIMUM:
+                        size = self.block_size
+                pool.extend(reserve_entities(dataset, size))
+            return [pool.popleft() for _ in range(count)]
+
+    def reset(self, dataset=None):
+        with self._lock:
+            if dataset is None:
+                self._pools.clear()
+            else:
+                self._pools.pop(dataset.dataset, None)
+
+
+def reserve_entities(dataset, count):
+    # checked first, as a nextval past the end of the sequence fails after
+    # using up the ids before it
+    remaining = remaining_entities(dataset)
+    if remaining is not None and count > remaining:
+        raise ValueError(
+            f"Only {remaining} entity ids left for {dataset.dataset}, "
+            f"{count} are needed"
+        )
+    sequence_name = entity_sequence_name(dataset.dataset)
+    result = db.session.execute(
+        text(f"SELECT nextval('{sequence_name}') FROM generate_series(1, :count)"),
+        {"count": count},
+    )
+    entities = [row[0] for row in result]
+    _check_headroom(dataset, entities[-1])
+    return entities
+
+
+def remaining_entities(dataset):
+    """
+    Entity ids left in the dataset's sequence, or None if it has no sequence
+    """
+    row = db.session.execute(
+        text(
+            "SELECT min_value, max_value, last_value FROM pg_sequences "
+            "WHERE sequencename = :name"
+        ),
+        {"name": entity_sequence_name(dataset.dataset)},
+    ).one_or_none()
+    if row is None:
+        return None
+    if row.last_value is None:
+        return row.max_value - row.min_value + 1
+    return row.max_value - row.last_value
+
+
+def _check_headroom(dataset, last_entity):
+    if dataset.entity_minimum is None or dataset.entity_maximum is None:
+        return
+    size = dataset.entity_maximum - dataset.entity_minimum + 1
+    remaining = dataset.entity_maximum - last_entity
+    if remaining < size * ENTITY_HEADROOM_WARNING:
+        logger.warning(
+            f"Only {remaining} entity ids left for {dataset.dataset} "
+            f"(range {dataset.entity_minimum} to {dataset.entity_maximum})"
+        )
+
+
+def entity_headroom():
+    """
+    Remaining entity ids in each dataset's range, from the sequences
+    """
+    sequences = {
+        row.sequencename: row
+        for row in db.session.execute(
+            text(
+                "SELECT sequencename, min_value, max_value, last_value "
+                "FROM pg_sequences WHERE sequencename LIKE '%_entity_seq'"
+            )
+        )
+    }
+    headroom = {}
+    for dataset in db.session.execute(
+        text("SELECT dataset FROM dataset ORDER BY dataset")
+    ).scalars():
+        row = sequences.get(entity_sequence_name(dataset))
+        if row is None:
+            continue
+        used = 0 if row.last_value is None else row.last_value - row.min_value + 1
+        headroom[dataset] = {
+            "minimum": row.min_value,
+            "maximum": row.max_value,
+            "used": used,
+            "remaining": row.max_value - row.min_value + 1 - used,
+        }
+    return headroom
+
+
+entity_allocator = EntityAllocator()
+
 
 def get_next_entity(dataset):
-    sequence_name = f"{dataset.dataset.replace('-', '_')}_entity_seq"
-    result = db.session.execute(text(f"SELECT nextval('{sequence_name}')"))
-    return result.scalar()
+    return entity_allocator.next(dataset)
 
 
 def make_reference(dataset, entity):
@@ -1,18 +1,27 @@
 from csv import DictWriter
-from io import StringIO
+from io import BytesIO, StringIO
 
 from flask import (
     Blueprint,
     abort,
+    current_app,
     flash,
     make_response,
     redirect,
     render_template,
+    stream_template,
     url_for,
 )
 from pydantic import ValidationError
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
 
+from application.blueprints.dataset.bulk import BulkEdit, BulkEditError, editable_fields
+from application.blueprints.dataset.ingest import (
+    MAX_REPORTED_ERRORS,
+    RecordIngest,
+    read_csv,
+)
 from application.blueprints.dataset.utils import (
     create_record,
     get_next_entity,
@@ -21,14 +30,22 @@ from application.blueprints.dataset.utils import (
 from application.database.models import Dataset, Record
 from application.extensions import db
 from application.forms.builder import FormBuilder
+from application.forms.forms import BulkEditForm, CsvUploadForm
+from application.jobs.queue import enqueue
+from application.monitoring.metrics import export_bytes
 from application.validation.models import RecordModel
 
 ds = Blueprint("dataset", __name__, template_folder="templates", url_prefix="/dataset")
 
+# records fetched from the server side cursor at a time on listing pages
+STREAM_BATCH_SIZE = 500
+# characters of html gathered before a chunk of a listing page is sent
+STREAM_BUFFER_SIZE = 16384
+
 
 @ds.route("/<string:dataset>")
 def dataset(dataset):
-    ds = Dataset.query.get_or_404(dataset)
+    ds = _listing_dataset(dataset)
     breadcrumbs = {
         "items": [
             {"text": "Home", "href": url_for("main.index")},
@@ -37,12 +54,18 @@ def dataset(dataset):
             },
         ]
     }
-    return render_template("dataset/dataset.html", dataset=ds, breadcrumbs=breadcrumbs)
+    return _render_listing(
+        "dataset/dataset.html",
+        dataset=ds,
+        records=_listed_records(ds),
+        record_count=_record_count(ds),
+        breadcrumbs=breadcrumbs,
+    )
 
 
 @ds.route("/<string:dataset>/records")
 def records(dataset):
-    ds = Dataset.query.get_or_404(dataset)
+    ds = _listing_dataset(dataset)
 
     breadcrumbs = {
         "items": [
@@ -56,15 +79,73 @@ def records(dataset):
     }
 
     page = {"title": ds.name, "caption": "Dataset"}
-    return render_template(
+    return _render_listing(
         "dataset/records.html",
         dataset=ds,
+        records=_listed_records(ds),
+        record_count=_record_count(ds),
         breadcrumbs=breadcrumbs,
         page=page,
         sub_navigation=None,
     )
 
 
+def _render_listing(template, **context):
+    """
+    Renders a page listing a dataset's records. With STREAM_LISTINGS on the
+    page is sent as it's rendered, so the browser can start on the head and
+    the first rows while the rest are still being fetched, and the whole
+    page is never held in memory. An error part way through can't be shown
+    as an error page once the first chunk has gone, it's only logged.
+
+    The request's teardown, which closes the database session, runs before
+    a streamed page is rendered, so anything the template reads has to be
+    loaded already or be loaded while it's rendered, see _listing_dataset
+    and _listed_records.
+    """
+    if not current_app.config.get("STREAM_LISTINGS", True):
+        return render_template(template, **context)
+    return current_app.response_class(
+        _buffered(stream_template(template, **context), STREAM_BUFFER_SIZE)
+    )
+
+
+def _listing_dataset(dataset):
+    return Dataset.query.options(
+        selectinload(Dataset.fields), joinedload(Dataset.parent_dataset)
+    ).get_or_404(dataset)
+
+
+def _listed_records(ds):
+    # the query is only made once the template starts on the records, in the
+    # session the stream uses. yield_per reads through a server side cursor,
+    # a batch at a time.
+    yield from (
+        Record.query.filter(Record.dataset_id == ds.dataset)
+        .order_by(Record.entity)
+        .yield_per(STREAM_BATCH_SIZE)
+    )
+
+
+def _record_count(ds):
+    return Record.query.filter(Record.dataset_id == ds.dataset).count()
+
+
+def _buffered(chunks, size):
+    # jinja yields every bit of text between tags separately
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield "".join(buffer)
+
+
 @ds.route("/<string:dataset>.csv")
 def csv(dataset):
     ds = Dataset.query.get_or_404(dataset)
@@ -78,6 +159,7 @@ def csv(dataset):
             writer.writerow(record.to_dict())
 
         csv_output = output.getvalue().encode("utf-8")
+        export_bytes("csv", len(csv_output))
         response = make_response(csv_output)
         response.headers["Content-Disposition"] = (
             f"attachment; filename={ds.dataset}.csv"
@@ -133,8 +215,9 @@ def add_record(dataset):
 
             try:
                 entity = get_next_entity(ds)
-            except SQLAlchemyError as e:
-                if "exceeds sequence" in str(e):
+            except (SQLAlchemyError, ValueError) as e:
+                # the allocator raises ValueError once the range is used up
+                if isinstance(e, ValueError) or "exceeds sequence" in str(e):
                     flash(f"No more entity IDs available for {ds.dataset}")
                 db.session.rollback()
                 return redirect(url_for("dataset.dataset", dataset=ds.dataset))
@@ -180,6 +263,123 @@ def add_record(dataset):
     )
 
 
+@ds.route("/<string:dataset>/upload", methods=["GET", "POST"])
+def upload_csv(dataset):
+    ds = Dataset.query.get_or_404(dataset)
+
+    breadcrumbs = {
+        "items": [
+            {"text": "Home", "href": url_for("main.index")},
+            {
+                "text": ds.name.capitalize(),
+                "href": url_for("dataset.dataset", dataset=ds.dataset),
+            },
+            {"text": "Upload"},
+        ]
+    }
+
+    form = CsvUploadForm()
+    report = None
+    if form.validate_on_submit():
+        if current_app.config["BACKGROUND_JOBS"]:
+            job = _enqueue_upload(ds, form)
+            if job is not None:
+                return redirect(url_for("main.job", token=job.token))
+        else:
+            columns, unmatched, rows = read_csv(form.csv_file.data.stream, ds.fields)
+            if not columns:
+                form.csv_file.errors = [
+                    "None of the columns match fields in this dataset"
+                ]
+            else:
+                ingest = RecordIngest(ds)
+                errors = []
+                for result in ingest.ingest(rows):
+                    if result["errors"] and len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append(result)
+                report = {
+                    "counts": ingest.counts,
+                    "errors": errors,
+                    "unmatched": unmatched,
+                }
+
+    return render_template(
+        "dataset/upload.html",
+        dataset=ds,
+        breadcrumbs=breadcrumbs,
+        form=form,
+        report=report,
+    )
+
+
+def _enqueue_upload(ds, form):
+    # the file goes in the job, as the worker may not share this disk
+    data = form.csv_file.data.read()
+    columns, _, _ = read_csv(BytesIO(data), ds.fields)
+    if not columns:
+        form.csv_file.errors = ["None of the columns match fields in this dataset"]
+        return None
+    return enqueue("csv-upload", payload=data, dataset=ds.dataset)
+
+
+@ds.route("/<string:dataset>/bulk-edit", methods=["GET", "POST"])
+def bulk_edit(dataset):
+    ds = Dataset.query.get_or_404(dataset)
+
+    breadcrumbs = {
+        "items": [
+            {"text": "Home", "href": url_for("main.index")},
+            {
+                "text": ds.name.capitalize(),
+                "href": url_for("dataset.records", dataset=ds.dataset),
+            },
+            {"text": "Bulk edit"},
+        ]
+    }
+
+    form = BulkEditForm()
+    form.match_field.choices = [("", "Any record")] + [
+        (field.field, field.field) for field in ds.ordered_fields()
+    ]
+    form.field.choices = [(field.field, field.field) for field in editable_fields(ds)]
+    matching = None
+    updated = None
+    if form.validate_on_submit():
+        edit = BulkEdit(
+            ds,
+            form.match_field.data,
+            form.match_value.data,
+            form.field.data,
+            form.value.data if form.action.data == "set" else None,
+        )
+        try:
+            edit.validate()
+            if form.confirmed.data:
+                updated = edit.apply()
+            else:
+                # show how many records will change before applying the edit
+                matching = edit.count()
+                form.confirmed.data = "1"
+        except BulkEditError as e:
+            form.field.errors = [str(e)]
+        except ValueError as e:
+            form.value.errors = [str(e)]
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            form.field.errors = [
+                f"Records could not be updated: {e.__class__.__name__}"
+            ]
+
+    return render_template(
+        "dataset/bulk-edit.html",
+        dataset=ds,
+        breadcrumbs=breadcrumbs,
+        form=form,
+        matching=matching,
+        updated=updated,
+    )
+
+
 @ds.route("/<string:dataset>/<string:entity>")
 def record(dataset, entity):
     ds = Dataset.query.get_or_404(dataset)
@@ -295,7 +495,15 @@ def add_related(dataset, entity, related_dataset):
             del data["csrf_token"]
 
         record_model = RecordModel.from_data(data, related_ds.fields)
-        entity = get_next_entity(related_ds)
+        try:
+            entity = get_next_entity(related_ds)
+        except (SQLAlchemyError, ValueError) as e:
+            if isinstance(e, ValueError) or "exceeds sequence" in str(e):
+                flash(f"No more entity IDs available for {related_ds.dataset}")
+            db.session.rollback()
+            return redirect(
+                url_for("dataset.record", dataset=ds.dataset, entity=r.entity)
+            )
 
         try:
             validated_data = record_model.model_dump(
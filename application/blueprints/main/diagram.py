@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+import time
+
+from flask import current_app
+
+from application.monitoring.metrics import outbound_http
+
+logger = logging.getLogger(__name__)
+
+SPECIFICATION_URL = "https://digital-land.github.io/specification/specification"
+DIAGRAM_TIMEOUT = 10
+# seconds to wait before trying again after a failed refresh
+RETRY_INTERVAL = 300
+
+# specifications with a refresh under way in this process
+_refreshing = set()
+_attempted = {}
+_lock = threading.Lock()
+
+
+def cached_diagram(specification):
+    """
+    Returns the path of the local copy of the specification's diagram, or
+    None if there isn't one yet. Once the copy is older than
+    DIAGRAM_CACHE_TTL it's fetched again in the background, and the old
+    copy is used until that finishes, so this never waits on the network.
+    """
+    directory = current_app.config["DIAGRAM_CACHE_DIR"]
+    path = _diagram_path(directory, specification)
+    checked = _last_checked(path)
+    if (
+        checked is None
+        or time.time() - checked > current_app.config["DIAGRAM_CACHE_TTL"]
+    ):
+        _refresh_in_background(directory, specification)
+    return path if os.path.isfile(path) else None
+
+
+def fetch_diagram(directory, specification):
+    """
+    Downloads the specification's diagram to the cache directory. Returns
+    its path, or None if the specification doesn't have a diagram, which is
+    remembered so it isn't asked for again until the cache expires.
+    """
+    import requests
+
+    url = f"{SPECIFICATION_URL}/{specification}/diagram.svg"
+    with outbound_http(url):
+        response = requests.get(url, timeout=DIAGRAM_TIMEOUT)
+    path = _diagram_path(directory, specification)
+    os.makedirs(directory, exist_ok=True)
+    if response.status_code == 404:
+        if os.path.exists(path):
+            os.remove(path)
+        open(f"{path}.missing", "w").close()
+        return None
+    response.raise_for_status()
+    # written alongside then moved, so a diagram is never served half written
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(response.content)
+    os.replace(temporary, path)
+    if os.path.exists(f"{path}.missing"):
+        os.remove(f"{path}.missing")
+    return path
+
+
+def _refresh_in_background(directory, specification):
+    with _lock:
+        if specification in _refreshing:
+            return
+        if time.time() - _attempted.get(specification, 0) < RETRY_INTERVAL:
+            return
+        _refreshing.add(specification)
+        _attempted[specification] = time.time()
+
+    def refresh():
+        try:
+            fetch_diagram(directory, specification)
+        except OSError as e:
+            # requests' exceptions are OSErrors too
+            logger.warning("Failed to fetch diagram for %s: %s", specification, e)
+        finally:
+            with _lock:
+                _refreshing.discard(specification)
+
+    threading.Thread(target=refresh, name="diagram-refresh", daemon=True).start()
+
+
+def _diagram_path(directory, specification):
+    return os.path.join(directory, f"{specification}.svg")
+
+
+def _last_checked(path):
+    times = [
+        os.path.getmtime(p) for p in (path, f"{path}.missing") if os.path.exists(p)
+    ]
+    return max(times) if times else None
@@ -0,0 +1,25 @@
+import zipfile
+from csv import DictWriter
+from io import StringIO
+
+
+def write_specification_zip(specification, file):
+    """
+    Writes a csv of each dataset in the specification to a zip file, inside
+    a directory named after the specification
+    """
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as zf:
+        for dataset in specification.ordered_datasets:
+            output = StringIO()
+            fieldnames = [field.field for field in dataset.ordered_fields()]
+            writer = DictWriter(output, fieldnames)
+            writer.writeheader()
+
+            if dataset.records:
+                for record in dataset.records:
+                    writer.writerow(record.to_dict())
+
+            csv_content = output.getvalue().encode("utf-8")
+            zf.writestr(
+                f"{specification.specification}/{dataset.dataset}.csv", csv_content
+            )
@@ -1,32 +1,31 @@
-import zipfile
-from csv import DictWriter
-from io import BytesIO, StringIO
+from io import BytesIO
 
-import requests
-from flask import Blueprint, make_response, render_template
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    make_response,
+    redirect,
+    render_template,
+    send_file,
+    url_for,
+)
 
-from application.database.models import Specification
+from application.blueprints.main.diagram import cached_diagram
+from application.blueprints.main.utils import write_specification_zip
+from application.database.models import Dataset, Job, Specification
+from application.jobs.queue import enqueue
+from application.monitoring.metrics import export_bytes
 
 main = Blueprint("main", __name__, template_folder="templates")
 
-SPECIFICATION_URL = "https://digital-land.github.io/specification/specification"
-
 
 @main.route("/")
 def index():
     specification = Specification.query.one_or_none()
-    if specification is not None:
-        try:
-            diagram_url = (
-                f"{SPECIFICATION_URL}/{specification.specification}/diagram.svg"
-            )
-            resp = requests.get(diagram_url)
-            resp.raise_for_status()
-        except requests.exceptions.HTTPError:
-            print(f"Failed to fetch diagram for {specification.specification}")
-            diagram_url = None
-    else:
-        diagram_url = None
+    diagram_url = None
+    if specification is not None and cached_diagram(specification.specification):
+        diagram_url = url_for("main.diagram")
     return render_template(
         "index.html",
         specification=specification,
@@ -34,43 +33,65 @@ def index():
     )
 
 
+@main.route("/specification/diagram.svg")
+def diagram():
+    specification = Specification.query.one_or_none()
+    if specification is None:
+        abort(404)
+    path = cached_diagram(specification.specification)
+    if path is None:
+        abort(404)
+    return send_file(
+        path,
+        mimetype="image/svg+xml",
+        max_age=current_app.config["DIAGRAM_CACHE_TTL"],
+    )
+
+
 @main.route("/download-all")
 def download_all():
     specification = Specification.query.one_or_none()
     if not specification:
         return "No specification found", 404
 
-    # Create a BytesIO object to store the zip file
-    memory_file = BytesIO()
+    if current_app.config["BACKGROUND_JOBS"]:
+        job = enqueue("export")
+        return redirect(url_for("main.job", token=job.token))
 
-    # Create the zip file
-    with zipfile.ZipFile(memory_file, "w", zipfile.ZIP_DEFLATED) as zf:
-        # Iterate through all datasets in the specification
-        for dataset in specification.ordered_datasets:
-            # Create CSV content for this dataset
-            output = StringIO()
-            fieldnames = [field.field for field in dataset.ordered_fields()]
-            writer = DictWriter(output, fieldnames)
-            writer.writeheader()
-
-            # Write records if they exist
-            if dataset.records:
-                for record in dataset.records:
-                    writer.writerow(record.to_dict())
-
-            # Add the CSV file to the zip inside a directory named after the specification
-            csv_content = output.getvalue().encode("utf-8")
-            zf.writestr(
-                f"{specification.specification}/{dataset.dataset}.csv", csv_content
-            )
+    memory_file = BytesIO()
+    write_specification_zip(specification, memory_file)
 
     # Seek to the beginning of the BytesIO object
     memory_file.seek(0)
 
     # Create the response
+    export_bytes("zip", memory_file.getbuffer().nbytes)
     response = make_response(memory_file.getvalue())
     response.headers["Content-Type"] = "application/zip"
     response.headers["Content-Disposition"] = (
         f"attachment; filename={specification.specification}.zip"
     )
     return response
+
+
+@main.route("/jobs/<token>")
+def job(token):
+    job = Job.query.filter_by(token=token).first_or_404()
+    dataset = None
+    if job.type == "csv-upload":
+        dataset = Dataset.query.get(job.arguments["dataset"])
+    return render_template("job.html", job=job, dataset=dataset)
+
+
+@main.route("/jobs/<token>/download")
+def job_download(token):
+    job = Job.query.filter_by(token=token).first_or_404()
+    if (
+        job.status != "done"
+        or not (job.result or {}).get("filename")
+        or job.output is None
+    ):
+        abort(404)
+    return send_file(
+        BytesIO(job.output), as_attachment=True, download_name=job.result["filename"]
+    )
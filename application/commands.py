@@ -1,34 +1,58 @@
 import json
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import click
-import requests
-from flask.cli import AppGroup
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
 from sqlalchemy import text
 
-from application.blueprints.dataset.utils import create_record
+from application.blueprints.dataset.utils import (
+    create_record,
+    entity_headroom,
+    entity_sequence_name,
+)
+from application.blueprints.main.diagram import fetch_diagram
 from application.database.models import (
     Category,
     CategoryValue,
     Dataset,
     Field,
+    ImportRun,
     Organisation,
     Record,
+    RecordChange,
     Specification,
+    SyncState,
     dataset_field,
 )
 from application.extensions import db
+from application.importer.cache import ResponseCache
+from application.importer.ledger import ImportLedger
+from application.importer.progress import Progress, http_latency
+from application.importer.sources import DatasetteSource, SQLiteSource
+from application.importer.sync import DeltaSync
+from application.importer.synthetic import SyntheticData
+from application.importer.upsert import upsert_category_values, upsert_organisations
+from application.importer.utils import content_hash, extract_load_data
+from application.jobs.handlers import HANDLERS
+from application.jobs.queue import POLL_INTERVAL, enqueue, work
+from application.monitoring import profiling
+from application.monitoring.metrics import outbound_http
 from application.validation.models import RecordModel
 
-DATASETTE_URL = "https://datasette.planning.data.gov.uk"
-DIGTAL_LAND_DB_URL = f"{DATASETTE_URL}/digital-land"
-SPECIFICATION_URL = f"{DIGTAL_LAND_DB_URL}/specification.json"
-SPECIFICATION_QUERY = (
-    "?specification__exact={specification}&end_date__isblank&_shape=object"
-)
-FIELDS_URL = f"{DIGTAL_LAND_DB_URL}/field.json?_shape=array"
-CATEGORY_DATASETS_URL = f"{DIGTAL_LAND_DB_URL}/dataset.json?end_date__isblank=1&typology__exact=category&_shape=array"
-CATEGORY_VALUES_URL = "https://dataset-editor.development.planning.data.gov.uk/dataset/{category_reference}.json"
+# the database of specification tables on DATASETTE_URL
+DIGITAL_LAND_DB = "digital-land"
+
+HTTP_TIMEOUT = 60
+# server errors and dropped connections are retried with an increasing wait
+HTTP_RETRIES = 3
+HTTP_RETRY_BACKOFF = 0.5
+FETCH_WORKERS = 8
+SEED_BATCH_SIZE = 50
+# entity data changes far more often than specification metadata
+ENTITY_CACHE_TTL = 3600
 
 DATASETTE_SQL_QUERY = """
 SELECT * FROM entity
@@ -39,13 +63,45 @@ AND organisation_entity = {organisation_entity}
 
 specification_cli = AppGroup("specification")
 
+_response_cache = None
+
+
+def cache_options(f):
+    f = click.option(
+        "--no-cache", is_flag=True, help="Bypass the local http response cache"
+    )(f)
+    f = click.option(
+        "--offline",
+        is_flag=True,
+        help="Only replay responses from the local http response cache",
+    )(f)
+    return f
 
-def _get_specification(specification):
-    print(f"Getting specification for {specification}")
-    url = (
-        f"{SPECIFICATION_URL}{SPECIFICATION_QUERY.format(specification=specification)}"
+
+def background_option(f):
+    return click.option(
+        "--background",
+        is_flag=True,
+        help="Queue the command to be run by a worker instead",
+    )(f)
+
+
+def _configure_cache(offline=False, no_cache=False, ttl=None):
+    global _response_cache
+    _response_cache = ResponseCache(
+        current_app.config["HTTP_CACHE_DIR"],
+        ttl=current_app.config["HTTP_CACHE_TTL"] if ttl is None else ttl,
+        offline=offline,
+        enabled=not no_cache,
     )
-    return _get(url)
+    if offline:
+        print("Running offline, responses will only be read from the local cache")
+
+
+def _get_cache():
+    if _response_cache is None:
+        _configure_cache()
+    return _response_cache
 
 
 @specification_cli.command("seed-data")
@@ -58,7 +114,24 @@ def _get_specification(specification):
 @click.option(
     "--organisation", default=None, help="Only records from the given organisation"
 )
-def get_seed_data(size, organisation):
+@click.option(
+    "--resume", is_flag=True, help="Carry on from the last failed or stopped run"
+)
+@background_option
+@cache_options
+def get_seed_data(size, organisation, resume, background, offline, no_cache):
+    if background:
+        job = enqueue(
+            "seed-data",
+            size=size,
+            organisation=organisation,
+            resume=resume,
+            offline=offline,
+            no_cache=no_cache,
+        )
+        print(f"Queued seed-data job {job.id}")
+        return
+    _configure_cache(offline, no_cache)
     print(f"Getting seed data for {size} records")
     # There's only one specification in db at a time for now
     spec = Specification.query.first()
@@ -78,7 +151,7 @@ def get_seed_data(size, organisation):
     else:
         organisation_entity = None
 
-    url = f"{DATASETTE_URL}/{spec.parent_dataset.dataset}/entity.json?_shape=array&_size={size}"
+    url = f"{_datasette_url()}/{spec.parent_dataset.dataset}/entity.json?_shape=array&_size={size}"
     if spec.specification == "tree-preservation-order":
         if organisation_entity is not None and organisation_entity != "67":
             print(
@@ -90,33 +163,70 @@ def get_seed_data(size, organisation):
     if organisation_entity is not None:
         url = f"{url}&organisation_entity__exact={organisation_entity}"
 
-    data = _get(url)
+    ledger = ImportLedger(
+        "seed-data", {"size": size, "organisation": organisation}, resume=resume
+    )
+    try:
+        loaded = _load_seed_data(spec, url, ledger)
+    except Exception as e:
+        ledger.fail()
+        print(f"Error loading seed data: {str(e)}")
+        print("Run again with --resume to carry on from the last completed batch")
+        return sys.exit(1)
+    if not loaded:
+        ledger.finish("failed")
+        return sys.exit(1)
+    ledger.finish()
+
+
+def _load_seed_data(spec, url, ledger):
+    data = _get_or_raise(url, ttl=ENTITY_CACHE_TTL)
     fields = [field.field for field in spec.parent_dataset.fields]
 
     if len(data) == 0:
         print(f"No data found for {spec.parent_dataset.dataset}")
-        return sys.exit(1)
-
-    for d in data:
-        load_data = extract_load_data(d, fields)
-        try:
-            model = RecordModel.from_data(load_data, spec.parent_dataset.fields)
-            validated_data = model.model_dump(by_alias=True, exclude={"fields": True})
-            reference = d.get("reference", None)
-            record = create_record(
-                d["entity"], validated_data, spec.parent_dataset, reference=reference
-            )
-            organisation_entity = d.get("organisation_entity", None)
-            if organisation_entity is not None:
-                org = Organisation.query.filter(
-                    Organisation.entity == organisation_entity
-                ).one_or_none()
-                if org is not None:
-                    record.organisation_id = org.organisation
+        return False
+
+    stage = spec.parent_dataset.dataset
+    progress = Progress(stage, total=len(data))
+    for start in range(0, len(data), SEED_BATCH_SIZE):
+        batch = data[start : start + SEED_BATCH_SIZE]
+        key = f"{batch[0]['entity']}-{batch[-1]['entity']}"
+        if ledger.is_complete(stage, key):
+            progress.advance(len(batch), records=0)
+            continue
+        started = time.monotonic()
+        errors = 0
+        for d in batch:
+            load_data = extract_load_data(d, fields)
+            try:
+                model = RecordModel.from_data(load_data, spec.parent_dataset.fields)
+                validated_data = model.model_dump(
+                    by_alias=True, exclude={"fields": True}
+                )
+                reference = d.get("reference", None)
+                record = create_record(
+                    d["entity"],
+                    validated_data,
+                    spec.parent_dataset,
+                    reference=reference,
+                )
+                organisation_entity = d.get("organisation_entity", None)
+                if organisation_entity is not None:
+                    org = Organisation.query.filter(
+                        Organisation.entity == organisation_entity
+                    ).one_or_none()
+                    if org is not None:
+                        record.organisation_id = org.organisation
+                record.content_hash = content_hash(d)
                 db.session.add(record)
-        except Exception as e:
-            print(f"Error creating record: {e}")
-    db.session.commit()
+            except Exception as e:
+                errors += 1
+                print(f"Error creating record: {e}")
+        ledger.complete(stage, key, len(batch) - errors, errors, started)
+        db.session.commit()
+        progress.advance(len(batch), records=len(batch) - errors)
+    progress.report()
 
     references = [
         {"dataset": d["dataset"], "reference": d["reference"], "entity": d["entity"]}
@@ -125,8 +235,15 @@ def get_seed_data(size, organisation):
 
     for dataset in spec.parent_dataset.children:
         print(f"Getting seed data for dependent dataset {dataset.dataset}")
+        stage = dataset.dataset
+        progress = Progress(stage, total=len(references))
         fields = [field.field for field in dataset.fields]
         for reference in references:
+            key = str(reference["entity"])
+            if ledger.is_complete(stage, key):
+                progress.advance(records=0)
+                continue
+            started = time.monotonic()
             owning_record = Record.query.get(
                 (reference["entity"], reference["dataset"])
             )
@@ -134,14 +251,15 @@ def get_seed_data(size, organisation):
                 print(
                     f"No owning record found for {reference['dataset']} record {reference['reference']}"
                 )
+                progress.advance(records=0)
                 continue
             sql = DATASETTE_SQL_QUERY.format(
                 property=spec.parent_dataset.dataset,
                 reference=reference["reference"],
                 organisation_entity=owning_record.organisation.entity,
             )
-            query = f"{DATASETTE_URL}/{dataset.dataset}.json?sql={sql}&_shape=array"
-            dependent_data = _get(query)
+            query = f"{_datasette_url()}/{dataset.dataset}.json?sql={sql}&_shape=array"
+            dependent_data = _get_or_raise(query, ttl=ENTITY_CACHE_TTL)
             for dd in dependent_data:
                 load_data = extract_load_data(dd, fields)
                 model = RecordModel.from_data(load_data, dataset.fields)
@@ -153,17 +271,99 @@ def get_seed_data(size, organisation):
                     dd["entity"], validated_data, dataset, reference=reference
                 )
                 dependent_record.owning_record = owning_record
+                dependent_record.content_hash = content_hash(dd)
                 db.session.add(dependent_record)
-                print(
-                    f"Added dependent {dataset.dataset} record {dependent_record.reference}"
-                )
+            ledger.complete(stage, key, len(dependent_data), started=started)
+            db.session.commit()
+            progress.advance(records=len(dependent_data))
+        progress.report()
+    return True
+
+
+@specification_cli.command("sync-data")
+@click.option("--dataset", "dataset_name", default=None, help="Only sync this dataset")
+@click.option(
+    "--organisation", default=None, help="Only records from the given organisation"
+)
+@click.option(
+    "--reset", is_flag=True, help="Forget the high-water marks and check everything"
+)
+@background_option
+@cache_options
+def sync_data(dataset_name, organisation, reset, background, offline, no_cache):
+    if background:
+        job = enqueue(
+            "sync-data",
+            dataset=dataset_name,
+            organisation=organisation,
+            reset=reset,
+            offline=offline,
+            no_cache=no_cache,
+        )
+        print(f"Queued sync-data job {job.id}")
+        return
+    _configure_cache(offline, no_cache)
+    spec = Specification.query.first()
+    if spec is None:
+        print("No specification found")
+        return sys.exit(1)
+
+    organisation_entity = None
+    if organisation is not None:
+        org = Organisation.query.get(organisation)
+        if org is None:
+            print(f"Organisation {organisation} not found")
+            return sys.exit(1)
+        organisation_entity = org.entity
+
+    # parents first so that child records can be linked to them
+    datasets = [
+        dataset
+        for dataset in spec.ordered_datasets
+        if dataset_name is None or dataset.dataset == dataset_name
+    ]
+    if not datasets:
+        print(f"Dataset {dataset_name} not found in {spec.specification}")
+        return sys.exit(1)
+
+    if reset:
+        SyncState.query.filter(
+            SyncState.dataset_id.in_([dataset.dataset for dataset in datasets])
+        ).delete()
         db.session.commit()
 
+    for dataset in datasets:
+        print(f"Syncing {dataset.dataset}")
+        sync = DeltaSync(
+            dataset,
+            lambda url: _get_or_raise(url, ttl=0),
+            _datasette_url(),
+            organisation_entity=organisation_entity,
+        )
+        try:
+            counts = sync.run()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error syncing {dataset.dataset}: {str(e)}")
+            return sys.exit(1)
+        print(
+            f"{dataset.dataset}: {counts['added']} added, {counts['updated']} updated, "
+            f"{counts['unchanged']} unchanged, {counts['skipped']} skipped"
+        )
+
 
 @specification_cli.command("init")
 @click.argument("reference")
 @click.option("--parent", default=None, help="Parent dataset")
-def init_specification(reference, parent):
+@click.option(
+    "--sqlite",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Read the specification from a local copy of digital-land.sqlite3",
+)
+@cache_options
+def init_specification(reference, parent, sqlite, offline, no_cache):
+    _configure_cache(offline, no_cache)
     spec = Specification.query.all()
     if len(spec) > 0:
         print(
@@ -174,29 +374,38 @@ def init_specification(reference, parent):
         )
         return sys.exit(1)
 
-    specification = _get_specification(reference)
+    source = _get_source(sqlite)
+    print(f"Getting specification for {reference}")
+    specification = source.get_specification(reference)
     if specification is None:
         print(f"Specification {reference} not found")
         return
 
     try:
-        data, name = _get_specification_data(reference, specification)
+        data, name = _get_specification_data(specification)
 
         # Start transaction
         db.session.begin_nested()
 
         _import_specification_datasets(reference, data, name)
-        _set_entity_minimum_and_maximum()
+        dataset_data = source.get_datasets(
+            [dataset.dataset for dataset in Dataset.query.all()]
+        )
+        _set_entity_minimum_and_maximum(dataset_data)
         _import_dataset_fields(data)
-        _set_field_attributes()
+        _set_field_attributes(source)
         _get_and_import_category_values()
         _set_parent_dataset(parent)
-        _check_for_geography_datasets()
-        _import_organisations()
+        _check_for_geography_datasets(dataset_data)
+        _import_organisations(source)
 
         # If we get here, commit the transaction
         db.session.commit()
         print(f"Successfully initialised specification {reference}")
+        # offline and sqlite imports make no requests, the server fetches the
+        # diagram in the background once the home page is shown instead
+        if not offline and sqlite is None:
+            _fetch_diagram(reference)
 
     except Exception as e:
         # If anything fails, rollback the transaction
@@ -205,16 +414,39 @@ def init_specification(reference, parent):
         return sys.exit(1)
 
 
+@specification_cli.command("generate-data")
+@click.option(
+    "--count",
+    default=1000,
+    type=click.IntRange(1),
+    help="Number of records to generate for each dataset",
+)
+@click.option("--seed", default=None, type=int, help="Seed for repeatable data")
+def generate_data(count, seed):
+    spec = Specification.query.first()
+    if spec is None:
+        print("No specification found")
+        return sys.exit(1)
+    print(f"Generating {count} records for each {spec.specification} dataset")
+    counts = SyntheticData(spec, seed=seed).generate(count)
+    for dataset, generated in counts.items():
+        print(f"{dataset}: {generated} records")
+
+
 @specification_cli.command("clear-all")
 def clear_all_data():
     print("Clearing all data")
 
     # Drop sequences for each dataset
     for dataset in Dataset.query.all():
-        sequence_name = f"{dataset.dataset.replace('-', '_')}_entity_seq"
+        sequence_name = entity_sequence_name(dataset.dataset)
         db.session.execute(text(f"DROP SEQUENCE IF EXISTS {sequence_name}"))
 
     # Clear all data
+    for run in ImportRun.query.all():
+        db.session.delete(run)
+    db.session.query(SyncState).delete()
+    db.session.query(RecordChange).delete()
     db.session.query(dataset_field).delete()
     db.session.query(Record).delete()
     db.session.query(CategoryValue).delete()
@@ -230,6 +462,10 @@ def clear_all_data():
 def clear_seed_data():
     print("Clearing seed data")
 
+    for run in ImportRun.query.all():
+        db.session.delete(run)
+    db.session.query(SyncState).delete()
+    db.session.query(RecordChange).delete()
     db.session.query(Record).delete()
     db.session.commit()
 
@@ -245,16 +481,138 @@ def get_category_values():
                 print(v)
 
 
-def _get(url):
+@specification_cli.command("sync-reference-data")
+@click.option(
+    "--sqlite",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Read organisations from a local copy of digital-land.sqlite3",
+)
+@cache_options
+def sync_reference_data(sqlite, offline, no_cache):
+    # a refresh always asks again, responses are still cached for --offline
+    _configure_cache(offline, no_cache, ttl=0)
+    try:
+        _get_and_import_category_values()
+        _import_organisations(_get_source(sqlite))
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error syncing reference data: {str(e)}")
+        return sys.exit(1)
+
+
+@specification_cli.command("entity-headroom")
+def show_entity_headroom():
+    for dataset, headroom in entity_headroom().items():
+        total = headroom["maximum"] - headroom["minimum"] + 1
+        print(
+            f"{dataset}: {headroom['remaining']} of {total} entity ids left "
+            f"({headroom['remaining'] / total:.1%})"
+        )
+
+
+@specification_cli.command("clear-http-cache")
+def clear_http_cache():
+    removed = _get_cache().clear()
+    print(f"Removed {removed} cached files")
+
+
+@click.command("worker")
+@click.option(
+    "--type",
+    "types",
+    multiple=True,
+    type=click.Choice(sorted(HANDLERS)),
+    help="Only run jobs of this type, can be given more than once",
+)
+@click.option("--burst", is_flag=True, help="Stop once there are no jobs queued")
+@click.option(
+    "--poll-interval",
+    default=POLL_INTERVAL,
+    type=click.IntRange(1),
+    help="Seconds to wait between checks for new jobs",
+)
+@with_appcontext
+def worker(types, burst, poll_interval):
+    work(HANDLERS, types=list(types), burst=burst, poll_interval=poll_interval)
+
+
+@click.command("profile-token")
+@click.option(
+    "--mode",
+    default="sample",
+    type=click.Choice(profiling.MODES),
+    help="Sample for folded stacks, or cprofile for a pstats file",
+)
+@with_appcontext
+def profile_token(mode):
+    print(profiling.profile_token(mode))
+
+
+def _fetch_diagram(reference):
+    try:
+        if fetch_diagram(current_app.config["DIAGRAM_CACHE_DIR"], reference) is None:
+            print(f"No diagram found for {reference}")
+    except OSError as e:
+        print(f"Failed to fetch diagram for {reference}: {e}")
+
+
+def _get(url, ttl=None):
+    import requests
+
+    # a CacheMiss, offline, isn't caught: with nothing to fall back on the
+    # import has to stop rather than commit without what's missing
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        return _get_cache().get(url, _fetch, ttl=ttl)
     except requests.exceptions.HTTPError as e:
         print(f"Error getting {url}: {e}")
         return []
 
 
+# read from the app config so they can be set per app, for a local stand-in
+def _datasette_url():
+    return current_app.config["DATASETTE_URL"].rstrip("/")
+
+
+def _dataset_editor_url():
+    return current_app.config["DATASET_EDITOR_URL"].rstrip("/")
+
+
+def _get_or_raise(url, ttl=None):
+    return _get_cache().get(url, _fetch, ttl=ttl)
+
+
+def _get_source(sqlite=None):
+    if sqlite is not None:
+        print(f"Reading specification tables from {sqlite}")
+        return SQLiteSource(sqlite)
+    return DatasetteSource(
+        _get, f"{_datasette_url()}/{DIGITAL_LAND_DB}", get_or_raise=_get_or_raise
+    )
+
+
+def _fetch(url):
+    # imported here as the app loads this module, but only commands fetch
+    import requests
+
+    for attempt in range(HTTP_RETRIES + 1):
+        started = time.monotonic()
+        try:
+            with outbound_http(url):
+                response = requests.get(url, timeout=HTTP_TIMEOUT)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == HTTP_RETRIES:
+                raise
+        else:
+            if response.status_code < 500 or attempt == HTTP_RETRIES:
+                break
+        finally:
+            http_latency.record(time.monotonic() - started)
+        time.sleep(HTTP_RETRY_BACKOFF * 2**attempt)
+    response.raise_for_status()
+    return response.json()
+
+
 def _import_specification_datasets(reference, data, name):
     spec = Specification(specification=reference, name=name)
     db.session.add(spec)
@@ -296,33 +654,33 @@ def _import_dataset_fields(data):
         db.session.commit()
 
 
-def _set_field_attributes():
-    for field in Field.query.all():
-        field_url = f"{FIELDS_URL}&field__exact={field.field}"
-        field_data = _get(field_url)
-        if field_data and len(field_data) > 0:
-            field.name = field_data[0]["name"]
-            field.cardinality = field_data[0]["cardinality"]
-            field.datatype = field_data[0]["datatype"]
-            typology = field_data[0]["typology"]
+def _set_field_attributes(source):
+    fields = Field.query.all()
+    field_data_by_field = source.get_fields([field.field for field in fields])
+    for field in fields:
+        field_data = field_data_by_field.get(field.field)
+        if field_data is not None:
+            field.name = field_data["name"]
+            field.cardinality = field_data["cardinality"]
+            field.datatype = field_data["datatype"]
+            typology = field_data["typology"]
             if typology == "category":
-                field.parent_field = field_data[0]["parent_field"]
+                field.parent_field = field_data["parent_field"]
             db.session.add(field)
     db.session.commit()
 
 
-def _set_entity_minimum_and_maximum():
+def _set_entity_minimum_and_maximum(dataset_data):
     for dataset in Dataset.query.all():
-        url = f"{DIGTAL_LAND_DB_URL}/dataset.json?dataset__exact={dataset.dataset}&_shape=array"
-        data = _get(url)
-        if data and len(data) > 0:
-            min_entity = data[0]["entity_minimum"]
-            max_entity = data[0]["entity_maximum"]
+        data = dataset_data.get(dataset.dataset)
+        if data is not None:
+            min_entity = data["entity_minimum"]
+            max_entity = data["entity_maximum"]
             dataset.entity_minimum = min_entity
             dataset.entity_maximum = max_entity
 
             # Create sequence for this dataset
-            sequence_name = f"{dataset.dataset.replace('-', '_')}_entity_seq"
+            sequence_name = entity_sequence_name(dataset.dataset)
             db.session.execute(
                 text(
                     f"""
@@ -339,54 +697,57 @@ def _set_entity_minimum_and_maximum():
     db.session.commit()
 
 
-def _get_specification_data(reference, specification):
-    data_str = specification[reference]["json"]
-    name = specification[reference]["name"]
+def _get_specification_data(specification):
+    data_str = specification["json"]
+    name = specification["name"]
     data = json.loads(data_str)
     return data, name
 
 
 def _get_and_import_category_values():
-    for category in Category.query.all():
-        reference = category.reference
-        url = CATEGORY_VALUES_URL.format(category_reference=reference)
-        category_values = _get(url)
+    categories = [category.reference for category in Category.query.all()]
+    urls = [
+        f"{_dataset_editor_url()}/dataset/{reference}.json" for reference in categories
+    ]
+    # make sure the cache is configured before handing _get to other threads
+    _get_cache()
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        responses = list(executor.map(_get, urls))
+
+    rows = []
+    for category_reference, category_values in zip(categories, responses):
         if category_values is None or "records" not in category_values:
-            print(f"No records found for {reference}")
+            print(f"No records found for {category_reference}")
             continue
-        for record in category_values["records"]:
-            if (
-                record.get("end-date", None) is not None
-                and record.get("end_date") != ""
-            ):
-                continue
-            if "prefix" not in record or record["prefix"] == "":
-                print(f"No prefix found for {reference}")
-                continue
-            if "reference" not in record or record["reference"] == "":
-                print(f"No reference found for {reference}")
-                continue
-            prefix = record["prefix"]
-            reference = record["reference"]
-            name = record["name"] if record["name"] else None
-            start_date = record["start-date"] if record["start-date"] else None
-            if (
-                CategoryValue.query.filter(
-                    CategoryValue.prefix == prefix, CategoryValue.reference == reference
-                ).one_or_none()
-                is None
-            ):
-                category_value = CategoryValue(
-                    prefix=prefix,
-                    reference=reference,
-                    name=name,
-                    category_reference=category.reference,
-                    start_date=start_date,
-                )
-                db.session.add(category_value)
-                db.session.commit()
-            else:
-                print(f"Category value {prefix} {reference} already exists")
+        rows.extend(
+            _category_value_rows(category_reference, category_values["records"])
+        )
+    count = upsert_category_values(rows)
+    db.session.commit()
+    print(f"Imported {count} category values for {len(categories)} categories")
+
+
+def _category_value_rows(category_reference, records):
+    rows = []
+    for record in records:
+        if record.get("end-date", None) is not None and record.get("end_date") != "":
+            continue
+        if "prefix" not in record or record["prefix"] == "":
+            print(f"No prefix found for {category_reference}")
+            continue
+        if "reference" not in record or record["reference"] == "":
+            print(f"No reference found for {category_reference}")
+            continue
+        rows.append(
+            {
+                "prefix": record["prefix"],
+                "reference": record["reference"],
+                "name": record["name"] if record["name"] else None,
+                "category_reference": category_reference,
+                "start_date": record["start-date"] if record["start-date"] else None,
+            }
+        )
+    return rows
 
 
 def _set_parent_dataset(parent):
@@ -409,50 +770,33 @@ def _set_parent_dataset(parent):
     db.session.commit()
 
 
-def _check_for_geography_datasets():
-    url = "{datasette_url}/dataset.json?_shape=array&typology__exact=geography&dataset__exact={dataset}"
+def _check_for_geography_datasets(dataset_data):
     for dataset in Dataset.query.all():
-        url = url.format(datasette_url=DIGTAL_LAND_DB_URL, dataset=dataset.dataset)
-        resp = _get(url)
-        if len(resp) > 0:
+        data = dataset_data.get(dataset.dataset)
+        if data is not None and data.get("typology") == "geography":
             print(f"Setting {dataset.dataset} as geography dataset")
             dataset.is_geography = True
             db.session.add(dataset)
     db.session.commit()
 
 
-def _import_organisations():
-    url = f"{DIGTAL_LAND_DB_URL}/organisation.json?_shape=array&_size=max"
-    organisations = _get(url)
+def _import_organisations(source):
+    organisations = source.get_organisations()
+    rows = []
     for organisation in organisations:
         la_type = (
             organisation.get("local_authority_type")
             if organisation.get("local_authority_type")
             else None
         )
-        org = Organisation(
-            organisation=organisation["organisation"],
-            name=organisation["name"],
-            local_authority_type=la_type,
-            entity=organisation["entity"],
+        rows.append(
+            {
+                "organisation": organisation["organisation"],
+                "name": organisation["name"],
+                "local_authority_type": la_type,
+                "entity": organisation["entity"],
+            }
         )
-        db.session.add(org)
+    count = upsert_organisations(rows)
     db.session.commit()
-
-
-def extract_load_data(data, fields):
-    load_data = {}
-    for key, value in data.items():
-        k = key.replace("_", "-")
-        if k in fields:
-            load_data[k] = value
-    if "json" in data and data.get("json", None) is not None:
-        try:
-            json_data = json.loads(data["json"])
-            for key, value in json_data.items():
-                k = key.replace("_", "-")
-                if k in fields:
-                    load_data[k] = value
-        except json.JSONDecodeError:
-            print("Warning: Failed to parse JSON data for record")
-    return load_data
+    print(f"Imported {count} organisations")
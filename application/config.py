@@ -12,14 +12,71 @@ class Config(object):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://")
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_RECORD_QUERIES = False
+    SQLALCHEMY_RECORD_QUERIES = (
+        os.getenv("SQLALCHEMY_RECORD_QUERIES", "false").lower() == "true"
+    )
     DEBUG = False
     WTF_CSRF_ENABLED = True
     AUTHENTICATION_ON = True
+    HTTP_CACHE_DIR = os.getenv(
+        "HTTP_CACHE_DIR", os.path.join(PROJECT_ROOT, ".cache", "http")
+    )
+    HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", 86400))
+    # either can be pointed at a local stand-in, see tools/datasette_stub.py
+    DATASETTE_URL = os.getenv("DATASETTE_URL", "https://datasette.planning.data.gov.uk")
+    DATASET_EDITOR_URL = os.getenv(
+        "DATASET_EDITOR_URL", "https://dataset-editor.development.planning.data.gov.uk"
+    )
+    DIAGRAM_CACHE_DIR = os.getenv(
+        "DIAGRAM_CACHE_DIR", os.path.join(PROJECT_ROOT, ".cache", "diagrams")
+    )
+    DIAGRAM_CACHE_TTL = int(os.getenv("DIAGRAM_CACHE_TTL", 86400))
+    JINJA_BYTECODE_CACHE_DIR = os.getenv(
+        "JINJA_BYTECODE_CACHE_DIR", os.path.join(PROJECT_ROOT, ".cache", "jinja")
+    )
+    # rendered record cards kept per worker, 0 turns the cache off
+    FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", 10000))
+    FRAGMENT_CACHE_TTL = int(os.getenv("FRAGMENT_CACHE_TTL", 3600))
+    # send record listing pages as they're rendered
+    STREAM_LISTINGS = os.getenv("STREAM_LISTINGS", "true").lower() == "true"
+    # run exports and uploads on the job queue rather than in the request
+    BACKGROUND_JOBS = os.getenv("BACKGROUND_JOBS", "false").lower() == "true"
+    # count statements and database time per request, for a sample of requests
+    SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "false").lower() == "true"
+    SQL_INSTRUMENTATION_SAMPLE_RATE = float(
+        os.getenv("SQL_INSTRUMENTATION_SAMPLE_RATE", 1.0)
+    )
+    # an identical statement run this many times in a request is logged
+    SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", 5))
+    # statements slower than this many milliseconds are logged and explained
+    SLOW_QUERY_THRESHOLD = int(os.getenv("SLOW_QUERY_THRESHOLD", 0))
+    SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+    # milliseconds any one statement may run for while handling a request
+    STATEMENT_TIMEOUT = int(os.getenv("STATEMENT_TIMEOUT", 30000))
+    # profile a sample of requests, and any with a token from flask profile-token
+    PROFILING = os.getenv("PROFILING", "false").lower() == "true"
+    PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0.0))
+    # sample for folded stacks, or cprofile for pstats files
+    PROFILING_MODE = os.getenv("PROFILING_MODE", "sample")
+    PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", 0.005))
+    PROFILING_TRACEMALLOC = (
+        os.getenv("PROFILING_TRACEMALLOC", "false").lower() == "true"
+    )
+    PROFILING_OUTPUT_DIR = os.getenv(
+        "PROFILING_OUTPUT_DIR", os.path.join(PROJECT_ROOT, ".cache", "profiles")
+    )
+    PROFILING_TOKEN_MAX_AGE = int(os.getenv("PROFILING_TOKEN_MAX_AGE", 3600))
+    API_TOKENS = [
+        token.strip()
+        for token in os.getenv("API_TOKENS", "").split(",")
+        if token.strip()
+    ]
 
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "true").lower() == "true"
+    SLOW_QUERY_THRESHOLD = int(os.getenv("SLOW_QUERY_THRESHOLD", 500))
     WTF_CSRF_ENABLED = False
     AUTHENTICATION_ON = False
 
@@ -0,0 +1,60 @@
+import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from application.database.models import (
+    Dataset,
+    Record,
+    RecordChange,
+    record_version_seq,
+)
+from application.database.serialise import record_serialiser
+
+
+def record_snapshot(session, record):
+    # new records only have dataset_id set until they are flushed
+    dataset = session.get(Dataset, record.dataset_id)
+    fields = tuple(field.field for field in dataset.fields)
+    return {
+        key: value.isoformat() if isinstance(value, datetime.date) else value
+        for key, value in record_serialiser(fields)(record).items()
+    }
+
+
+def record_change(session, record, operation):
+    return RecordChange(
+        dataset_id=record.dataset_id,
+        entity=record.entity,
+        operation=operation,
+        data=record_snapshot(session, record),
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def log_record_changes(session, flush_context, instances):
+    """
+    Adds a record_change row for every record inserted or updated in the
+    flush, so the change log is written in the same transaction as the
+    records themselves. Updated records also get a new version.
+    """
+    changes = []
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Record):
+                changes.append(record_change(session, obj, "insert"))
+        for obj in session.dirty:
+            if not isinstance(obj, Record) or not session.is_modified(obj):
+                continue
+            # in sql, so concurrent updates can't both end up on one version
+            obj.version = record_version_seq.next_value()
+            end_date = inspect(obj).attrs.end_date.history
+            if (
+                end_date.added
+                and end_date.added[0] is not None
+                and not any(end_date.deleted)
+            ):
+                changes.append(record_change(session, obj, "archive"))
+            else:
+                changes.append(record_change(session, obj, "update"))
+    session.add_all(changes)
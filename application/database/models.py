@@ -1,14 +1,28 @@
 import datetime
+import secrets
 from functools import total_ordering
 from typing import List, Optional
 
-from sqlalchemy import Date, ForeignKey, ForeignKeyConstraint, Text
+from sqlalchemy import (
+    Date,
+    DateTime,
+    ForeignKey,
+    ForeignKeyConstraint,
+    LargeBinary,
+    Sequence,
+    Text,
+    exists,
+    select,
+    text,
+)
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from application.extensions import db
 
+record_version_seq = Sequence("record_version_seq", metadata=db.metadata)
+
 dataset_field = db.Table(
     "dataset_field",
     db.Column(
@@ -78,7 +92,7 @@ class Specification(DateModel):
 
     @property
     def has_data(self):
-        return any(dataset.records for dataset in self.datasets)
+        return any(dataset.has_records for dataset in self.datasets)
 
 
 class Dataset(DateModel):
@@ -123,6 +137,13 @@ class Dataset(DateModel):
     def name(self):
         return self.dataset.replace("-", " ")
 
+    @property
+    def has_records(self):
+        # asks the database rather than loading every record
+        return db.session.scalar(
+            select(exists().where(Record.dataset_id == self.dataset))
+        )
+
     def get(self, field):
         return self.data.get(field)
 
@@ -230,6 +251,15 @@ class Record(DateModel):
     )
     owning_record_dataset: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
+    # hash of the platform entity this record was last loaded from
+    content_hash: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # set again on every update, it keys the record's cached fragments. From
+    # one sequence, so a record deleted and added again never has a version
+    # its old row had.
+    version: Mapped[int] = mapped_column(
+        db.BigInteger, server_default=record_version_seq.next_value()
+    )
+
     owning_record: Mapped[Optional["Record"]] = relationship(
         "Record",
         remote_side=lambda: [Record.entity, Record.dataset_id],
@@ -357,3 +387,119 @@ class CategoryValue(DateModel):
     __table_args__ = (
         db.PrimaryKeyConstraint("prefix", "reference", name="pk_category_value"),
     )
+
+
+class SyncState(db.Model):
+    __tablename__ = "sync_state"
+
+    dataset_id: Mapped[str] = mapped_column(
+        Text,
+        ForeignKey("dataset.dataset", name="fk_dataset_sync_state"),
+        primary_key=True,
+    )
+    last_entry_date: Mapped[Optional[datetime.date]] = mapped_column(Date)
+    last_entity: Mapped[Optional[int]] = mapped_column(db.BigInteger)
+    synced_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+
+    __table_args__ = (db.PrimaryKeyConstraint("dataset_id", name="pk_sync_state"),)
+
+
+class ImportRun(db.Model):
+    __tablename__ = "import_run"
+
+    id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
+    command: Mapped[str] = mapped_column(Text)
+    arguments: Mapped[Optional[dict]] = mapped_column(JSONB)
+    status: Mapped[str] = mapped_column(Text, default="running")
+    started_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
+    finished_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    batches: Mapped[List["ImportBatch"]] = relationship(
+        "ImportBatch", back_populates="run", cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (db.PrimaryKeyConstraint("id", name="pk_import_run"),)
+
+
+class ImportBatch(db.Model):
+    __tablename__ = "import_batch"
+
+    run_id: Mapped[int] = mapped_column(
+        ForeignKey("import_run.id", name="fk_import_run_import_batch"),
+        primary_key=True,
+    )
+    stage: Mapped[str] = mapped_column(Text, primary_key=True)
+    batch: Mapped[str] = mapped_column(Text, primary_key=True)
+    record_count: Mapped[int] = mapped_column(db.Integer, default=0)
+    error_count: Mapped[int] = mapped_column(db.Integer, default=0)
+    duration: Mapped[Optional[float]] = mapped_column(db.Float)
+    finished_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
+    run: Mapped["ImportRun"] = relationship("ImportRun", back_populates="batches")
+
+    __table_args__ = (
+        db.PrimaryKeyConstraint("run_id", "stage", "batch", name="pk_import_batch"),
+    )
+
+
+class RecordChange(db.Model):
+    __tablename__ = "record_change"
+
+    id: Mapped[int] = mapped_column(db.BigInteger, primary_key=True)
+    dataset_id: Mapped[str] = mapped_column(Text)
+    entity: Mapped[int] = mapped_column(db.BigInteger)
+    operation: Mapped[str] = mapped_column(Text)
+    data: Mapped[Optional[dict]] = mapped_column(JSONB)
+    changed_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
+    # the id of the transaction that made the change, the change feed is read
+    # in this order as transactions can commit in a different order to ids
+    txid: Mapped[int] = mapped_column(
+        db.BigInteger, server_default=text("txid_current()")
+    )
+
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="pk_record_change"),
+        db.Index("ix_record_change_txid_id", "txid", "id"),
+        db.Index("ix_record_change_dataset_id", "dataset_id", "txid", "id"),
+    )
+
+
+class Job(db.Model):
+    __tablename__ = "job"
+
+    id: Mapped[int] = mapped_column(db.BigInteger, primary_key=True)
+    # the job's pages are found by this rather than the id, so only whoever
+    # queued a job, and was sent to its page, can see it or its files
+    token: Mapped[str] = mapped_column(Text, default=lambda: secrets.token_urlsafe(32))
+    type: Mapped[str] = mapped_column(Text)
+    arguments: Mapped[Optional[dict]] = mapped_column(JSONB)
+    status: Mapped[str] = mapped_column(Text, default="queued")
+    result: Mapped[Optional[dict]] = mapped_column(JSONB)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    attempts: Mapped[int] = mapped_column(default=0)
+    worker: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now
+    )
+    started_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    finished_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    # database time the running job's worker last showed it was still alive
+    heartbeat_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime)
+    # the file a job reads and the file it makes, kept here rather than on
+    # disk so the web and worker processes don't have to share one
+    payload: Mapped[Optional[bytes]] = mapped_column(LargeBinary, deferred=True)
+    output: Mapped[Optional[bytes]] = mapped_column(LargeBinary, deferred=True)
+
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="pk_job"),
+        db.Index("ix_job_status_id", "status", "id"),
+        db.Index("ix_job_token", "token", unique=True),
+    )
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
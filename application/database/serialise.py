@@ -0,0 +1,71 @@
+from functools import lru_cache
+
+from application.database.models import Record
+
+# record columns that hold a field's value directly rather than in data
+RECORD_COLUMNS = set(Record.__table__.columns.keys()) - {
+    "data",
+    "dataset_id",
+    "organisation_id",
+    "organisation_ids",
+    "owning_record_entity",
+    "owning_record_dataset",
+    "content_hash",
+    "version",
+}
+
+
+@lru_cache(maxsize=256)
+def record_serialiser(fields):
+    """
+    Builds a function that turns a record into a dict of the given fields.
+
+    The lookup for each field is worked out once per tuple of field names
+    rather than for every record, and organisations come straight from the
+    record's columns so serialising doesn't load anything else.
+    """
+    getters = []
+    columns = {"entity"}
+    for field in fields:
+        attr = field.replace("-", "_")
+        if field == "organisation":
+            getters.append((field, _organisation))
+            columns.add("organisation_id")
+        elif field == "organisations":
+            getters.append((field, _organisations))
+            columns.add("organisation_ids")
+        elif attr in RECORD_COLUMNS:
+            getters.append((field, _column(attr)))
+            columns.add(attr)
+        else:
+            getters.append((field, _data(field)))
+            columns.add("data")
+
+    def serialise(record):
+        return {field: getter(record) for field, getter in getters}
+
+    # the record columns needed, so callers can load only those
+    serialise.columns = frozenset(columns)
+    return serialise
+
+
+def _column(attr):
+    def get(record):
+        return getattr(record, attr)
+
+    return get
+
+
+def _data(field):
+    def get(record):
+        return record.data.get(field) if record.data else None
+
+    return get
+
+
+def _organisation(record):
+    return record.organisation_id
+
+
+def _organisations(record):
+    return ";".join(record.organisation_ids) if record.organisation_ids else None
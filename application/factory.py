@@ -1,14 +1,16 @@
 """The app module, containing the app factory function."""
 
-from flask import Flask, render_template
-from govuk_frontend_wtf.main import WTFormsHelpers
+import logging
+import os
 
-from application.database.models import *  # noqa - import all models for alembic
+from flask import Flask, render_template
+from flask.logging import default_handler
 
 
 def create_app(config_filename):
     app = Flask(__name__)
     app.config.from_object(config_filename)
+    register_logging(app)
     register_errorhandlers(app)
     register_blueprints(app)
     register_extensions(app)
@@ -16,9 +18,20 @@ def create_app(config_filename):
     register_context_processors(app)
     register_filters(app)
     register_commands(app)
+    register_monitoring(app)
     return app
 
 
+def register_logging(app):
+    # the application's module loggers, including app.logger, all log through
+    # flask's handler at INFO. Set up before app.logger is first used, so
+    # flask doesn't add its handler to that as well.
+    logger = logging.getLogger("application")
+    if not logger.handlers:
+        logger.addHandler(default_handler)
+        logger.setLevel(logging.INFO)
+
+
 def register_errorhandlers(app):
     def render_error(error):
         error_messages = {
@@ -39,18 +52,35 @@ def register_errorhandlers(app):
 
 
 def register_blueprints(app):
+    from application.blueprints.api.views import api
     from application.blueprints.dataset.views import ds
     from application.blueprints.main.views import main
 
     app.register_blueprint(main)
     app.register_blueprint(ds)
+    app.register_blueprint(api)
 
 
 def register_templates(app):
     """
     Register templates from packages
     """
-    from jinja2 import ChoiceLoader, PackageLoader, PrefixLoader
+    from govuk_frontend_wtf.main import WTFormsHelpers
+    from jinja2 import (
+        ChoiceLoader,
+        FileSystemBytecodeCache,
+        PackageLoader,
+        PrefixLoader,
+    )
+
+    # compiled templates are kept on disk, so new workers don't compile them again
+    cache_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_options = {
+            **app.jinja_options,
+            "bytecode_cache": FileSystemBytecodeCache(cache_dir),
+        }
 
     multi_loader = ChoiceLoader(
         [
@@ -67,6 +97,10 @@ def register_templates(app):
     app.jinja_loader = multi_loader
     WTFormsHelpers(app)
 
+    from application import fragments
+
+    fragments.init_app(app)
+
 
 def register_context_processors(app):
     """
@@ -91,6 +125,8 @@ def register_filters(app):
 
 
 def register_extensions(app):
+    import application.database.changes  # noqa - registers the change log listener
+    import application.database.models  # noqa - import all models for alembic
     from application.extensions import db, migrate
 
     db.init_app(app)
@@ -98,6 +134,17 @@ def register_extensions(app):
 
 
 def register_commands(app):
-    from application.commands import specification_cli
+    from application.commands import profile_token, specification_cli, worker
 
     app.cli.add_command(specification_cli)
+    app.cli.add_command(worker)
+    app.cli.add_command(profile_token)
+
+
+def register_monitoring(app):
+    from application.monitoring import metrics, profiling, slow_queries, sql
+
+    sql.init_app(app)
+    slow_queries.init_app(app)
+    metrics.init_app(app)
+    profiling.init_app(app)
@@ -5,10 +5,8 @@ from datetime import datetime
 from flask import render_template, request
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileRequired
-from geojson import loads
 from markupsafe import Markup
-from shapely import wkt
-from wtforms import Field
+from wtforms import Field, HiddenField, RadioField, SelectField, StringField
 from wtforms.validators import ValidationError
 
 
@@ -19,6 +17,10 @@ def curie_validator(form, field):
 
 
 def geometry_check(form, field):
+    # geojson and shapely are slow to import and only needed to check geometry
+    from geojson import loads
+    from shapely import wkt
+
     try:
         # Try parsing as GeoJSON
         geojson_obj = loads(field.data)
@@ -35,6 +37,8 @@ def geometry_check(form, field):
 
 
 def point_check(form, field):
+    from shapely import wkt
+
     try:
         geom = wkt.loads(field.data)
         if geom.geom_type != "Point":
@@ -241,3 +245,16 @@ class DatePartField(Field):
 
 class CsvUploadForm(FlaskForm):
     csv_file = FileField("Upload a file", validators=[FileRequired()])
+
+
+class BulkEditForm(FlaskForm):
+    match_field = SelectField("Records where")
+    match_value = StringField("is")
+    field = SelectField("Field to change")
+    action = RadioField(
+        "Change",
+        choices=[("set", "Set a new value"), ("clear", "Clear the value")],
+        default="set",
+    )
+    value = StringField("New value")
+    confirmed = HiddenField()
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, render_template
+from markupsafe import Markup
+
+from application.monitoring.metrics import cache_hit
+
+
+class FragmentCache:
+    """
+    A bounded cache of rendered html shared by the requests one worker
+    handles. The least recently used entries are dropped once there are
+    maxsize of them, and entries are dropped after ttl seconds so that
+    organisation and category names changed elsewhere are picked up.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, html = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def init_app(app):
+    app.extensions["fragment_cache"] = FragmentCache(
+        app.config.get("FRAGMENT_CACHE_SIZE", 10000),
+        app.config.get("FRAGMENT_CACHE_TTL", 3600),
+    )
+    app.jinja_env.globals["record_fragment"] = record_fragment
+
+
+def record_fragment(template, record):
+    """
+    Renders a template for one record, or returns the html it rendered last
+    time for the same version of the record and of its dataset's fields.
+    Every update to a record gives it a new version, so edits replace only
+    the fragments of the records they change. Versions come from one
+    sequence, so a record deleted and added again, as when seed data is
+    reloaded, doesn't pick up its old row's fragments.
+    """
+    cache = current_app.extensions["fragment_cache"]
+    if not cache.maxsize:
+        return Markup(render_template(template, record=record))
+    key = (
+        template,
+        record.dataset_id,
+        record.entity,
+        record.version,
+        schema_version(record.dataset),
+    )
+    html = cache.get(key)
+    cache_hit("fragment", html is not None)
+    if html is None:
+        html = Markup(render_template(template, record=record))
+        cache.set(key, html)
+    return html
+
+
+def schema_version(dataset):
+    # worked out once per dataset in a request
+    versions = g.setdefault("schema_versions", {})
+    if dataset.dataset not in versions:
+        versions[dataset.dataset] = hash(
+            (
+                dataset.name,
+                dataset.parent_dataset.name if dataset.parent_dataset else None,
+                tuple(
+                    (
+                        field.field,
+                        field.name,
+                        field.datatype,
+                        field.cardinality,
+                        field.category_reference,
+                    )
+                    for field in dataset.ordered_fields()
+                ),
+            )
+        )
+    return versions[dataset.dataset]
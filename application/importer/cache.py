@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from application.monitoring.metrics import cache_hit
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of JSON responses.
+
+    Response bodies are stored once under objects/ keyed by the sha256 of the
+    body, and each url gets a small index entry under urls/ pointing at the
+    body it last returned along with when it was fetched. Identical responses
+    for different urls (empty result sets for example) share one object.
+    """
+
+    def __init__(self, directory, ttl=86400, offline=False, enabled=True):
+        self.directory = directory
+        self.ttl = ttl
+        self.offline = offline
+        self.enabled = enabled or offline
+
+    def get(self, url, fetch, ttl=None):
+        if not self.enabled:
+            return fetch(url)
+
+        entry = self._read_entry(url)
+        if self.offline:
+            if entry is None:
+                cache_hit("http", False)
+                raise CacheMiss(f"No cached response for {url}")
+            cache_hit("http", True)
+            return self._read_object(entry["digest"])
+
+        ttl = self.ttl if ttl is None else ttl
+        if entry is not None and time.time() - entry["fetched_at"] < ttl:
+            try:
+                data = self._read_object(entry["digest"])
+                cache_hit("http", True)
+                return data
+            except FileNotFoundError:
+                pass
+
+        cache_hit("http", False)
+        data = fetch(url)
+        self._write(url, data)
+        return data
+
+    def clear(self):
+        removed = 0
+        for sub in ["urls", "objects"]:
+            path = os.path.join(self.directory, sub)
+            if not os.path.isdir(path):
+                continue
+            for name in os.listdir(path):
+                os.remove(os.path.join(path, name))
+                removed += 1
+        return removed
+
+    def _url_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "urls", f"{key}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest)
+
+    def _read_entry(self, url):
+        try:
+            with open(self._url_path(url)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _read_object(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return json.loads(f.read())
+
+    def _write(self, url, data):
+        body = json.dumps(data, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            _atomic_write(object_path, body)
+        entry = {"url": url, "digest": digest, "fetched_at": time.time()}
+        _atomic_write(self._url_path(url), json.dumps(entry).encode("utf-8"))
+
+
+def _atomic_write(path, content):
+    # a temporary file of its own, as threads fetching at once can be writing
+    # the same object
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
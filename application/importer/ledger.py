@@ -0,0 +1,67 @@
+import datetime
+import time
+
+from application.database.models import ImportBatch, ImportRun
+from application.extensions import db
+
+
+class ImportLedger:
+    """
+    Records which batches of a long running import have been committed.
+
+    complete() adds the ledger entry to the session, so committing a batch's
+    records commits its checkpoint in the same transaction. A resumed run
+    picks up the latest unfinished run with the same arguments and skips any
+    batch it already completed.
+    """
+
+    def __init__(self, command, arguments, resume=False):
+        run = None
+        if resume:
+            run = (
+                ImportRun.query.filter(
+                    ImportRun.command == command,
+                    ImportRun.arguments == arguments,
+                    ImportRun.status != "complete",
+                )
+                .order_by(ImportRun.started_at.desc())
+                .first()
+            )
+            if run is None:
+                print(f"No unfinished {command} run to resume, starting a new one")
+            else:
+                print(f"Resuming {command} run {run.id} from {run.started_at}")
+        if run is None:
+            run = ImportRun(command=command, arguments=arguments)
+            db.session.add(run)
+        run.status = "running"
+        db.session.commit()
+        self.run = run
+        self.completed = {(batch.stage, batch.batch) for batch in run.batches}
+
+    def is_complete(self, stage, batch):
+        return (stage, batch) in self.completed
+
+    def complete(self, stage, batch, record_count, error_count=0, started=None):
+        duration = time.monotonic() - started if started is not None else None
+        db.session.add(
+            ImportBatch(
+                run_id=self.run.id,
+                stage=stage,
+                batch=batch,
+                record_count=record_count,
+                error_count=error_count,
+                duration=duration,
+            )
+        )
+        self.completed.add((stage, batch))
+
+    def finish(self, status="complete"):
+        self.run.status = status
+        self.run.finished_at = datetime.datetime.now()
+        db.session.add(self.run)
+        db.session.commit()
+
+    def fail(self):
+        db.session.rollback()
+        self.finish("failed")
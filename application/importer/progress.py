@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import deque
+
+REPORT_INTERVAL = 2.0
+
+
+class LatencyRecorder:
+    """
+    Keeps the most recent request latencies so percentiles can be reported
+    while an import is running
+    """
+
+    def __init__(self, size=1000, name="http"):
+        self.name = name
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def summary(self):
+        values = [self.percentile(pct) for pct in (50, 95, 99)]
+        if values[0] is None:
+            return f"no {self.name} requests"
+        p50, p95, p99 = (f"{value * 1000:.0f}ms" for value in values)
+        return f"{self.name} p50 {p50} p95 {p95} p99 {p99}"
+
+
+http_latency = LatencyRecorder()
+
+
+class Progress:
+    """
+    Prints records/sec, http latency percentiles and an ETA for a stage
+    of an import, at most every REPORT_INTERVAL seconds
+    """
+
+    def __init__(self, label, total=None, latency=http_latency):
+        self.label = label
+        self.total = total
+        self.latency = latency
+        self.done = 0
+        self.records = 0
+        self.started = time.monotonic()
+        self._last_report = 0.0
+
+    def advance(self, done=1, records=None):
+        self.done += done
+        self.records += done if records is None else records
+        if time.monotonic() - self._last_report >= REPORT_INTERVAL:
+            self.report()
+
+    def report(self):
+        self._last_report = time.monotonic()
+        elapsed = self._last_report - self.started
+        rate = self.records / elapsed if elapsed > 0 else 0.0
+        line = f"{self.label}: {self.done}"
+        if self.total:
+            line = f"{line}/{self.total}"
+        line = f"{line} done, {self.records} records, {rate:.1f} records/s, {self.latency.summary()}"
+        if self.total and self.done:
+            remaining = elapsed / self.done * (self.total - self.done)
+            line = f"{line}, ETA {_format_duration(remaining)}"
+        print(line)
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
@@ -0,0 +1,111 @@
+import sqlite3
+
+IN_QUERY_SIZE = 100
+
+
+class DatasetteSource:
+    """
+    Reads specification tables from the digital-land datasette over http.
+
+    The get argument is the function used to fetch and decode a url, so
+    that responses go through the same cache as the rest of the import.
+    Fields, datasets and organisations are fetched with get_or_raise, so a
+    request that fails stops the import rather than leaving rows out.
+    """
+
+    def __init__(self, get, db_url, get_or_raise=None):
+        self._get = get
+        self._get_or_raise = get_or_raise or get
+        self.db_url = db_url
+
+    def get_specification(self, reference):
+        url = (
+            f"{self.db_url}/specification.json?specification__exact={reference}"
+            "&end_date__isblank&_shape=array"
+        )
+        return _first(self._get(url))
+
+    def get_fields(self, fields):
+        return self._get_in("field", fields)
+
+    def get_datasets(self, datasets):
+        return self._get_in("dataset", datasets)
+
+    def get_organisations(self):
+        return self._get_or_raise(
+            f"{self.db_url}/organisation.json?_shape=array&_size=max"
+        )
+
+    def _get_in(self, table, keys):
+        rows = {}
+        keys = sorted(set(keys))
+        # keep each url comfortably short, one request covers most specifications
+        for i in range(0, len(keys), IN_QUERY_SIZE):
+            chunk = ",".join(keys[i : i + IN_QUERY_SIZE])
+            url = (
+                f"{self.db_url}/{table}.json?{table}__in={chunk}&_shape=array&_size=max"
+            )
+            for row in self._get_or_raise(url):
+                rows[row[table]] = row
+        return rows
+
+
+class SQLiteSource:
+    """
+    Reads the same tables from a downloaded copy of digital-land.sqlite3
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._connection.row_factory = sqlite3.Row
+        return self._connection
+
+    def query(self, sql, params=()):
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def get_specification(self, reference):
+        return _first(
+            self.query(
+                "SELECT * FROM specification WHERE specification = ? "
+                "AND (end_date IS NULL OR end_date = '')",
+                (reference,),
+            )
+        )
+
+    def get_fields(self, fields):
+        return self._get_in("field", fields)
+
+    def get_datasets(self, datasets):
+        return self._get_in("dataset", datasets)
+
+    def get_organisations(self):
+        return self.query("SELECT * FROM organisation")
+
+    def _get_in(self, table, keys):
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        placeholders = ",".join("?" for _ in keys)
+        rows = self.query(
+            f"SELECT * FROM {table} WHERE {table} IN ({placeholders})", keys
+        )
+        return {row[table]: row for row in rows}
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def _first(rows):
+    if rows and len(rows) > 0:
+        return rows[0]
+    return None
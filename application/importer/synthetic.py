@@ -0,0 +1,202 @@
+import datetime
+import random
+import time
+
+from sqlalchemy import func, select
+
+from application.blueprints.dataset.ingest import BATCH_SIZE, RecordIngest
+from application.blueprints.dataset.utils import remaining_entities
+from application.database.models import CategoryValue, Organisation, Record
+from application.extensions import db
+from application.importer.progress import LatencyRecorder, Progress
+
+# references of records in other datasets that generated records link to,
+# sampled from the database so memory doesn't grow with the record count
+SAMPLE_SIZE = 10_000
+
+WORDS = (
+    "oak ash elm yew lime beech birch maple rowan holly willow hazel alder cedar "
+    "field lane green park hill brook mill church farm manor wood common"
+).split()
+
+# roughly the extent of England, for points and polygons
+MIN_X, MAX_X = -5.5, 1.7
+MIN_Y, MAX_Y = 50.0, 55.7
+
+
+class SyntheticData:
+    """
+    Generates plausible records for each dataset of a specification from
+    its field definitions.
+
+    Category fields get values from the loaded category values, organisation
+    fields from the loaded organisations, and records in a child dataset are
+    linked to records sampled from the parent dataset. Rows are generated as
+    they are needed and written by RecordIngest, the same path as a csv
+    upload, so generated records get entity ids, versions and change log
+    entries as any other record does.
+    """
+
+    def __init__(self, specification, seed=None, batch_size=BATCH_SIZE):
+        self.specification = specification
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.dataset_names = {dataset.dataset for dataset in specification.datasets}
+        self.organisations = [
+            org for (org,) in db.session.query(Organisation.organisation)
+        ]
+        self.category_values = {}
+        for category, reference in db.session.query(
+            CategoryValue.category_reference, CategoryValue.reference
+        ):
+            self.category_values.setdefault(category, []).append(reference)
+        # (reference, organisation) of records sampled per dataset
+        self.samples = {}
+
+    def generate(self, count):
+        counts = {}
+        # parents first so child records have something to link to
+        for dataset in self.specification.ordered_datasets:
+            counts[dataset.dataset] = self.generate_dataset(dataset, count)
+        return counts
+
+    def generate_dataset(self, dataset, count):
+        parents = self.sample(dataset.parent) if dataset.parent else None
+        if parents is not None and not parents:
+            print(f"Skipping {dataset.dataset}, no {dataset.parent} records to link to")
+            return 0
+        remaining = remaining_entities(dataset)
+        if remaining is not None and remaining < count:
+            print(f"Only {remaining} entity ids left for {dataset.dataset}")
+            count = remaining
+        if count == 0:
+            return 0
+
+        fields = list(dataset.fields)
+        ingest = RecordIngest(dataset, batch_size=self.batch_size)
+        latency = LatencyRecorder(name="batch")
+        progress = Progress(dataset.dataset, total=count, latency=latency)
+        rows = (
+            (line, self.record(dataset, fields, line, parents))
+            for line in range(1, count + 1)
+        )
+        started = time.monotonic()
+        error = None
+        for done, result in enumerate(ingest.ingest(rows), 1):
+            if error is None and result["errors"]:
+                error = f"line {result['line']}: {'; '.join(result['errors'])}"
+            # results come back a batch at a time, once it is committed
+            if done % self.batch_size == 0 or done == count:
+                now = time.monotonic()
+                latency.record(now - started)
+                started = now
+                progress.advance(done - progress.done)
+        progress.report()
+        if error is not None:
+            print(
+                f"{ingest.counts['failed']} {dataset.dataset} records failed, "
+                f"first at {error}"
+            )
+        # records linking to this dataset pick from the new records too
+        self.samples.pop(dataset.dataset, None)
+        return ingest.counts["created"]
+
+    def sample(self, dataset):
+        if dataset not in self.samples:
+            self.samples[dataset] = db.session.execute(
+                select(Record.reference, Record.organisation_id)
+                .where(Record.dataset_id == dataset)
+                .order_by(func.random())
+                .limit(SAMPLE_SIZE)
+            ).all()
+        return self.samples[dataset]
+
+    def record(self, dataset, fields, line, parents=None):
+        owning = self.random.choice(parents) if parents else None
+        organisation = (
+            owning[1]
+            if owning and owning[1]
+            else self.random.choice(self.organisations or [""])
+        )
+        # keyed by field as a csv upload is, the entity and reference are
+        # made when the record is
+        row = {}
+        if owning:
+            row["owning_record"] = owning[0]
+        for field in fields:
+            if field.field in ["entity", "prefix", "reference", "end-date"]:
+                continue
+            if field.field == "organisation":
+                row["organisation"] = organisation
+            elif field.field == "organisations":
+                row["organisations"] = ";".join(self._sample(self.organisations))
+            elif field.field == dataset.parent and owning:
+                row[field.field] = owning[0]
+            elif field.field in self.dataset_names:
+                # a reference to a record in another dataset
+                records = self.sample(field.field)
+                if records:
+                    row[field.field] = self.random.choice(records)[0]
+            else:
+                row[field.field] = self.value(dataset, field, line)
+        return row
+
+    def value(self, dataset, field, number):
+        if field.category_reference is not None:
+            values = self.category_values.get(field.category_reference, [])
+            if field.cardinality == "n":
+                return ";".join(self._sample(values))
+            return self.random.choice(values) if values else ""
+        if field.field == "name":
+            return f"{self._words(2).title()} {number}"
+        match field.datatype:
+            case "datetime":
+                return self._date().isoformat()
+            case "multipolygon":
+                return self._multipolygon()
+            case "point":
+                x, y = self._coordinates()
+                return f"POINT ({x} {y})"
+            case "url":
+                return f"https://example.com/{dataset.dataset}/{number}"
+            case "curie":
+                return f"{dataset.dataset}:{number}"
+            case "integer" | "decimal":
+                return str(self.random.randint(1, 1000))
+            case "text":
+                return self._words(self.random.randint(8, 30)).capitalize() + "."
+            case _:
+                return self._words(self.random.randint(1, 3))
+
+    def _sample(self, values):
+        if not values:
+            return []
+        return self.random.sample(values, self.random.randint(1, min(3, len(values))))
+
+    def _words(self, count):
+        return " ".join(self.random.choices(WORDS, k=count))
+
+    def _date(self):
+        return datetime.date(1990, 1, 1) + datetime.timedelta(
+            days=self.random.randrange(365 * 35)
+        )
+
+    def _coordinates(self):
+        return (
+            round(self.random.uniform(MIN_X, MAX_X), 6),
+            round(self.random.uniform(MIN_Y, MAX_Y), 6),
+        )
+
+    def _multipolygon(self):
+        x, y = self._coordinates()
+        width = self.random.uniform(0.0005, 0.01)
+        height = self.random.uniform(0.0005, 0.01)
+        ring = [
+            (x, y),
+            (x + width, y),
+            (x + width, y + height),
+            (x, y + height),
+            (x, y),
+        ]
+        points = ", ".join(f"{px:.6f} {py:.6f}" for px, py in ring)
+        return f"MULTIPOLYGON ((({points})))"
@@ -0,0 +1,39 @@
+from sqlalchemy.dialects.postgresql import insert
+
+from application.database.models import CategoryValue, Organisation
+from application.extensions import db
+
+BATCH_SIZE = 1000
+
+
+def upsert(model, rows, index_elements, batch_size=BATCH_SIZE):
+    """
+    Insert rows into the model's table in batches, updating any row whose
+    key already exists. Rows with a duplicate key keep the last value seen,
+    as postgres won't update the same row twice in one statement.
+    """
+    unique_rows = {}
+    for row in rows:
+        unique_rows[tuple(row[key] for key in index_elements)] = row
+    rows = list(unique_rows.values())
+    if not rows:
+        return 0
+
+    table = model.__table__
+    stmt = insert(table)
+    update_columns = [column for column in rows[0] if column not in index_elements]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(stmt, rows[i : i + batch_size])
+    return len(rows)
+
+
+def upsert_category_values(rows, batch_size=BATCH_SIZE):
+    return upsert(CategoryValue, rows, ["prefix", "reference"], batch_size)
+
+
+def upsert_organisations(rows, batch_size=BATCH_SIZE):
+    return upsert(Organisation, rows, ["organisation"], batch_size)
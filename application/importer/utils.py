@@ -0,0 +1,29 @@
+import hashlib
+import json
+
+
+def extract_load_data(data, fields):
+    load_data = {}
+    for key, value in data.items():
+        k = key.replace("_", "-")
+        if k in fields:
+            load_data[k] = value
+    if "json" in data and data.get("json", None) is not None:
+        try:
+            json_data = json.loads(data["json"])
+            for key, value in json_data.items():
+                k = key.replace("_", "-")
+                if k in fields:
+                    load_data[k] = value
+        except json.JSONDecodeError:
+            print("Warning: Failed to parse JSON data for record")
+    return load_data
+
+
+def content_hash(data):
+    """
+    Stable hash of an entity row from the platform, stored against the record
+    so a later sync can tell whether the entity has changed
+    """
+    body = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
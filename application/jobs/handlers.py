@@ -0,0 +1,75 @@
+from io import BytesIO
+
+from application.blueprints.dataset.ingest import (
+    MAX_REPORTED_ERRORS,
+    RecordIngest,
+    read_csv,
+)
+from application.blueprints.main.utils import write_specification_zip
+from application.database.models import Dataset, Specification
+from application.monitoring.metrics import export_bytes
+
+
+def export_specification(job):
+    specification = Specification.query.one_or_none()
+    if specification is None:
+        raise ValueError("No specification found")
+    output = BytesIO()
+    write_specification_zip(specification, output)
+    job.output = output.getvalue()
+    size = len(job.output)
+    export_bytes("zip", size)
+    return {"filename": f"{specification.specification}.zip", "size": size}
+
+
+def upload_csv(job):
+    dataset = Dataset.query.get(job.arguments["dataset"])
+    if dataset is None:
+        raise ValueError(f"Dataset {job.arguments['dataset']} not found")
+    _, unmatched, rows = read_csv(BytesIO(job.payload), dataset.fields)
+    ingest = RecordIngest(dataset)
+    errors = []
+    for result in ingest.ingest(rows):
+        if result["errors"] and len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(result)
+    # the file isn't needed once it has been loaded
+    job.payload = None
+    return {"counts": ingest.counts, "errors": errors, "unmatched": unmatched}
+
+
+def seed_data(job):
+    from application.commands import get_seed_data
+
+    return _run_command(get_seed_data, job.arguments)
+
+
+def sync_data(job):
+    from application.commands import sync_data
+
+    return _run_command(sync_data, job.arguments)
+
+
+def _run_command(command, arguments):
+    # the import commands report failure by exiting, so turn that into an error
+    args = []
+    for option, value in (arguments or {}).items():
+        if value is None or value is False:
+            continue
+        args.append(f"--{option.replace('_', '-')}")
+        if value is not True:
+            args.append(str(value))
+    try:
+        with command.make_context(command.name, args) as ctx:
+            command.invoke(ctx)
+    except SystemExit as e:
+        if e.code:
+            raise RuntimeError(f"{command.name} exited with status {e.code}")
+    return {}
+
+
+HANDLERS = {
+    "export": export_specification,
+    "csv-upload": upload_csv,
+    "seed-data": seed_data,
+    "sync-data": sync_data,
+}
@@ -0,0 +1,154 @@
+import datetime
+import os
+import socket
+import threading
+import time
+import traceback
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from application.database.models import Job
+from application.extensions import db
+
+POLL_INTERVAL = 5
+# seconds a running job can go without a heartbeat before it's taken to
+# belong to a worker that has died, and queued again
+LEASE = 300
+HEARTBEAT_INTERVAL = 30
+# jobs whose worker dies this many times are failed rather than queued again
+MAX_ATTEMPTS = 3
+
+
+def enqueue(job_type, payload=None, **arguments):
+    job = Job(
+        type=job_type,
+        arguments=arguments,
+        payload=payload,
+        status="queued",
+        attempts=0,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def claim(types=None, worker=None):
+    """
+    Takes the oldest queued job, optionally only of the given types, and
+    marks it as running. Rows locked by another worker's claim are skipped
+    rather than waited on, so any number of workers can poll the same table.
+    Jobs left running by a worker that has died are dealt with first.
+    """
+    reclaim()
+    stmt = (
+        select(Job)
+        .where(Job.status == "queued")
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if types:
+        stmt = stmt.where(Job.type.in_(types))
+    job = db.session.execute(stmt).scalar_one_or_none()
+    if job is None:
+        db.session.rollback()
+        return None
+    job.status = "running"
+    job.started_at = datetime.datetime.now()
+    job.heartbeat_at = func.now()
+    job.worker = worker
+    job.attempts += 1
+    db.session.commit()
+    return job
+
+
+def reclaim(lease=LEASE, max_attempts=MAX_ATTEMPTS):
+    """
+    Queues running jobs again once their worker has missed heartbeats for
+    lease seconds, or fails them if they have been tried max_attempts times.
+    Heartbeats use the database's clock, so workers on other hosts agree.
+    """
+    stale = (Job.status == "running") & (
+        Job.heartbeat_at < func.now() - datetime.timedelta(seconds=lease)
+    )
+    db.session.execute(
+        update(Job)
+        .where(stale, Job.attempts >= max_attempts)
+        .values(
+            status="failed",
+            error=f"The worker running this job stopped after {max_attempts} attempts",
+            finished_at=datetime.datetime.now(),
+        )
+    )
+    db.session.execute(
+        update(Job).where(stale).values(status="queued", worker=None, heartbeat_at=None)
+    )
+    db.session.commit()
+
+
+def run(job, handlers):
+    job_id = job.id
+    handler = handlers.get(job.type)
+    stopped = threading.Event()
+    heartbeat = threading.Thread(
+        target=_beat, args=(db.engine, job_id, stopped), name="job-heartbeat"
+    )
+    heartbeat.start()
+    try:
+        if handler is None:
+            raise ValueError(f"No handler for {job.type} jobs")
+        result = handler(job)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Job {job_id} failed: {str(e)}")
+        traceback.print_exc()
+        job = db.session.get(Job, job_id)
+        job.status = "failed"
+        job.error = str(e) or e.__class__.__name__
+    else:
+        job.status = "done"
+        job.result = result
+    finally:
+        stopped.set()
+        heartbeat.join()
+    job.finished_at = datetime.datetime.now()
+    db.session.commit()
+    return job
+
+
+def _beat(engine, job_id, stopped):
+    # on its own connection, so it isn't held up by the job's transaction
+    while not stopped.wait(HEARTBEAT_INTERVAL):
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == "running")
+                    .values(heartbeat_at=func.now())
+                )
+        except SQLAlchemyError as e:
+            # missing a few is fine, the lease is several intervals long
+            print(f"Job {job_id} heartbeat failed: {str(e)}")
+
+
+def work(handlers, types=None, burst=False, poll_interval=POLL_INTERVAL):
+    """
+    Runs queued jobs one at a time until stopped, or until the queue is
+    empty when burst is set
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Worker {worker} waiting for {', '.join(types or ['all'])} jobs")
+    while True:
+        job = claim(types, worker)
+        if job is None:
+            if burst:
+                return
+            time.sleep(poll_interval)
+            continue
+        print(f"Running {job.type} job {job.id}")
+        started = time.monotonic()
+        job = run(job, handlers)
+        print(f"Job {job.id} {job.status} in {time.monotonic() - started:.1f}s")
+        # don't carry loaded records over from one job to the next
+        db.session.expunge_all()
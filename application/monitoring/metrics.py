@@ -0,0 +1,153 @@
+import os
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.exc import SQLAlchemyError
+
+from application.blueprints.api.utils import token_required
+from application.monitoring.timing import on_statement
+
+# metric values are written to files in this directory when it is set, so
+# that /metrics on any one gunicorn worker reports the totals for them all
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_LATENCY = Histogram(
+    "app_request_duration_seconds",
+    "Time taken to handle a request",
+    ["endpoint", "method", "status"],
+)
+DB_TIME = Histogram(
+    "app_request_db_duration_seconds",
+    "Time spent running SQL statements per request",
+    ["endpoint"],
+)
+OUTBOUND_HTTP_TIME = Histogram(
+    "app_outbound_http_duration_seconds",
+    "Time taken by http requests to other services",
+    ["host"],
+)
+CACHE_REQUESTS = Counter(
+    "app_cache_requests_total",
+    "Cache lookups by cache and whether they were a hit or a miss",
+    ["cache", "result"],
+)
+EXPORT_BYTES = Counter(
+    "app_export_bytes_total",
+    "Bytes of csv and zip exports sent or written",
+    ["format"],
+)
+
+
+class EntityHeadroomCollector:
+    """
+    Reports the entity ids left in each dataset's range when scraped, read
+    from the database rather than tracked by any one worker
+    """
+
+    def collect(self):
+        from application.blueprints.dataset.utils import entity_headroom
+        from application.extensions import db
+
+        remaining = GaugeMetricFamily(
+            "app_entity_ids_remaining",
+            "Entity ids left in the dataset's range",
+            labels=["dataset"],
+        )
+        used = GaugeMetricFamily(
+            "app_entity_ids_used",
+            "Entity ids used from the dataset's range",
+            labels=["dataset"],
+        )
+        try:
+            headrooms = entity_headroom()
+        except SQLAlchemyError:
+            db.session.rollback()
+            return
+        for dataset, headroom in headrooms.items():
+            remaining.add_metric([dataset], headroom["remaining"])
+            used.add_metric([dataset], headroom["used"])
+        yield remaining
+        yield used
+
+
+def cache_hit(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def export_bytes(format, size):
+    EXPORT_BYTES.labels(format).inc(size)
+
+
+@contextmanager
+def outbound_http(url):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        OUTBOUND_HTTP_TIME.labels(urlparse(url).hostname or "unknown").observe(
+            time.perf_counter() - started
+        )
+
+
+def init_app(app):
+    on_statement(_add_db_time)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.request_db_time = 0.0
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        labels = (request.endpoint or "unmatched", request.method, response.status_code)
+        if response.is_streamed:
+            # observed once the page has been sent, so the time and the
+            # queries run while sending it are included
+            state = g._get_current_object()
+            response.call_on_close(lambda: _observe_request(started, state, *labels))
+        else:
+            _observe_request(started, g, *labels)
+        return response
+
+    # the same bearer tokens as the api, as it shows how full each dataset is
+    app.add_url_rule("/metrics", "metrics", token_required(metrics))
+
+
+def _observe_request(started, state, endpoint, method, status):
+    REQUEST_LATENCY.labels(endpoint, method, status).observe(
+        time.perf_counter() - started
+    )
+    DB_TIME.labels(endpoint).observe(state.get("request_db_time", 0.0))
+
+
+def metrics():
+    if MULTIPROCESS_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    headroom = CollectorRegistry()
+    headroom.register(EntityHeadroomCollector())
+    body = generate_latest(registry) + generate_latest(headroom)
+    return Response(body, content_type=CONTENT_TYPE_LATEST)
+
+
+def _add_db_time(conn, statement, parameters, executemany, duration):
+    if has_request_context() and "request_db_time" in g:
+        g.request_db_time += duration
@@ -0,0 +1,196 @@
+import cProfile
+import datetime
+import logging
+import os
+import random
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+
+from flask import current_app, g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+logger = logging.getLogger(__name__)
+
+MODES = ("sample", "cprofile")
+# allocation sites listed when tracemalloc is on
+TOP_ALLOCATIONS = 25
+
+# one profile at a time per process, cProfile can't run in two threads at once
+_lock = threading.Lock()
+
+
+class Sampler:
+    """
+    A statistical profiler for one thread. A background thread reads the
+    profiled thread's stack every interval and counts each distinct stack,
+    which is written out in the folded format flamegraph.pl and speedscope
+    read. The overhead depends on the interval rather than on how many
+    calls the profiled code makes, so templates and ORM loading aren't
+    slowed down more than anything else.
+    """
+
+    extension = "folded"
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sample, name="profile-sampler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[_folded(frame)] += 1
+
+
+class CProfiler:
+    extension = "prof"
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+def init_app(app):
+    """
+    Profiles a sample of requests, or any request with a ?profile= token
+    made by flask profile-token, and writes a profile for each to a
+    directory named after the endpoint. Off unless PROFILING is set.
+    """
+    if not app.config.get("PROFILING"):
+        return
+    sample_rate = app.config.get("PROFILING_SAMPLE_RATE", 0.0)
+
+    @app.before_request
+    def start_profiling():
+        mode = _requested_mode()
+        if mode is None and random.random() < sample_rate:
+            mode = app.config.get("PROFILING_MODE", "sample")
+        if mode is None or not _lock.acquire(blocking=False):
+            return
+        if mode == "cprofile":
+            profiler = CProfiler()
+        else:
+            profiler = Sampler(app.config.get("PROFILING_INTERVAL", 0.005))
+        if app.config.get("PROFILING_TRACEMALLOC"):
+            tracemalloc.start()
+        g.profiler = profiler
+        profiler.start()
+
+    @app.after_request
+    def stop_profiling_when_sent(response):
+        # a streamed page is mostly rendered after the request's teardown, so
+        # its profile is stopped once the page has been sent instead
+        if response.is_streamed and "profiler" in g:
+            profiler = g.pop("profiler")
+            path = _output_path()
+            description = f"{request.method} {request.path}"
+            response.call_on_close(lambda: _finish(app, profiler, path, description))
+        return response
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            _finish(app, profiler, _output_path(), f"{request.method} {request.path}")
+
+
+def _finish(app, profiler, path, description):
+    try:
+        profiler.stop()
+        profiler.write(f"{path}.{profiler.extension}")
+        if app.config.get("PROFILING_TRACEMALLOC"):
+            _write_allocations(f"{path}.alloc.txt")
+        logger.info("%s: profile written to %s", description, path)
+    finally:
+        if app.config.get("PROFILING_TRACEMALLOC"):
+            tracemalloc.stop()
+        _lock.release()
+
+
+def profile_token(mode="sample"):
+    return _serializer().dumps(mode)
+
+
+def _requested_mode():
+    token = request.args.get("profile")
+    if not token:
+        return None
+    try:
+        mode = _serializer().loads(
+            token, max_age=current_app.config.get("PROFILING_TOKEN_MAX_AGE", 3600)
+        )
+    except BadSignature:
+        return None
+    return mode if mode in MODES else None
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt="profile")
+
+
+def _output_path():
+    directory = os.path.join(
+        current_app.config["PROFILING_OUTPUT_DIR"], request.endpoint or "unmatched"
+    )
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.datetime.now()
+    return os.path.join(
+        directory, f"{now:%Y%m%dT%H%M%S.%f}-{os.getpid()}-{request.method.lower()}"
+    )
+
+
+def _write_allocations(path):
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    with open(path, "w") as f:
+        f.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+        f.write("Largest allocations still held at the end of the request:\n\n")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            f.write(f"{stat}\n")
+
+
+def _folded(frame):
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+def _short_path(filename):
+    # without the install location, so profiles from different servers merge
+    for marker in ("site-packages", "application"):
+        _, found, rest = filename.rpartition(f"{os.sep}{marker}{os.sep}")
+        if found:
+            return rest if marker == "site-packages" else f"application/{rest}"
+    return os.path.basename(filename)
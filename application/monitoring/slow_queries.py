@@ -0,0 +1,138 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from application.monitoring.sql import call_site
+from application.monitoring.timing import on_statement
+
+logger = logging.getLogger(__name__)
+
+# the same statement is explained at most once in this many seconds
+EXPLAIN_INTERVAL = 600
+# explains waiting to run, any more slow statements are only logged
+MAX_PENDING_EXPLAINS = 10
+EXPLAIN_TIMEOUT = 60000
+MAX_EXPLAINED_STATEMENTS = 1000
+MAX_PARAMETERS_LENGTH = 1000
+# selects that change something when they run, such as reserving entity ids or
+# claiming a job, are only explained, not run again under ANALYZE
+SIDE_EFFECTS = re.compile(
+    r"\b(nextval|setval|pg_advisory\w*)\s*\("
+    r"|\bFOR\s+((NO\s+)?KEY\s+)?(UPDATE|SHARE)\b",
+    re.IGNORECASE,
+)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+_pending = threading.BoundedSemaphore(MAX_PENDING_EXPLAINS)
+_explained = {}
+_explained_lock = threading.Lock()
+
+
+def init_app(app):
+    """
+    Logs statements that take longer than SLOW_QUERY_THRESHOLD milliseconds
+    with the view and line of code that ran them, and the plan postgres
+    chose for them. The plan comes from running the statement again under
+    EXPLAIN (ANALYZE, BUFFERS) on a background thread, so the request isn't
+    held up, and only for SELECT statements. Selects that lock rows or use
+    sequences would do that again under ANALYZE, and a rollback doesn't
+    give back sequence values, so those get a plain EXPLAIN instead.
+
+    Every transaction begun while handling a request also gets a
+    statement_timeout of STATEMENT_TIMEOUT milliseconds, so one runaway
+    query can't tie up a worker. Commands and jobs aren't limited.
+    """
+    if app.config.get("STATEMENT_TIMEOUT") and not event.contains(
+        Session, "after_begin", _set_statement_timeout
+    ):
+        event.listen(Session, "after_begin", _set_statement_timeout)
+
+    if app.config.get("SLOW_QUERY_THRESHOLD"):
+        on_statement(_log_slow_query)
+
+
+def _set_statement_timeout(session, transaction, connection):
+    if not has_request_context() or connection.dialect.name != "postgresql":
+        return
+    timeout = current_app.config.get("STATEMENT_TIMEOUT")
+    if timeout:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
+def _log_slow_query(conn, statement, parameters, executemany, duration):
+    # explains run without an app context, so they aren't logged themselves
+    if not has_app_context():
+        return
+    threshold = current_app.config.get("SLOW_QUERY_THRESHOLD")
+    milliseconds = duration * 1000
+    if not threshold or milliseconds < threshold:
+        return
+    view = (request.endpoint or request.path) if has_request_context() else None
+    logger.warning(
+        "Slow statement, %.1fms in %s from %s\n%s\nparameters: %s",
+        milliseconds,
+        view or "no request",
+        call_site(),
+        statement,
+        repr(parameters)[:MAX_PARAMETERS_LENGTH],
+    )
+    if (
+        current_app.config.get("SLOW_QUERY_EXPLAIN", True)
+        and not executemany
+        and conn.dialect.name == "postgresql"
+        and _should_explain(statement)
+    ):
+        _executor.submit(_explain, conn.engine, statement, parameters, view)
+
+
+def _should_explain(statement):
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return False
+    now = time.monotonic()
+    with _explained_lock:
+        last = _explained.get(statement)
+        if last is not None and now - last < EXPLAIN_INTERVAL:
+            return False
+        if not _pending.acquire(blocking=False):
+            return False
+        # statements with IN lists of every length can add up
+        if len(_explained) >= MAX_EXPLAINED_STATEMENTS:
+            _explained.clear()
+        _explained[statement] = now
+    return True
+
+
+def _explain(engine, statement, parameters, view):
+    try:
+        with engine.connect() as conn:
+            # the statement is run again, so roll back whatever it does
+            with conn.begin() as transaction:
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT}")
+                explain = (
+                    "EXPLAIN"
+                    if SIDE_EFFECTS.search(statement)
+                    else "EXPLAIN (ANALYZE, BUFFERS)"
+                )
+                plan = conn.exec_driver_sql(
+                    f"{explain} {statement}", parameters
+                ).scalars()
+                logger.warning(
+                    "Plan of slow statement in %s\n%s\n%s",
+                    view or "no request",
+                    statement,
+                    "\n".join(plan),
+                )
+                transaction.rollback()
+    except SQLAlchemyError as e:
+        logger.warning(
+            "Could not explain slow statement in %s: %s", view or "no request", e
+        )
+    finally:
+        _pending.release()
@@ -0,0 +1,121 @@
+import logging
+import os
+import random
+import sys
+from collections import Counter
+
+from flask import g, has_request_context, request
+
+from application.monitoring.timing import on_statement
+
+logger = logging.getLogger(__name__)
+
+APPLICATION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MONITORING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# call sites kept for each repeated statement
+MAX_CALL_SITES = 5
+
+
+class RequestQueries:
+    """
+    Counts the statements run while handling one request and how long they
+    took. Identical statements are counted together, and where a statement
+    is run more than once the application code that ran it is noted, so
+    that N+1 patterns can be traced to the loop causing them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.call_sites = {}
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+        if self.statements[statement] > 1:
+            sites = self.call_sites.setdefault(statement, Counter())
+            site = call_site()
+            if site in sites or len(sites) < MAX_CALL_SITES:
+                sites[site] += 1
+
+    def repeated(self, threshold):
+        return [
+            (statement, count, self.call_sites.get(statement, {}))
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+def init_app(app):
+    if not app.config.get("SQL_INSTRUMENTATION"):
+        return
+    sample_rate = app.config.get("SQL_INSTRUMENTATION_SAMPLE_RATE", 1.0)
+    threshold = app.config.get("SQL_REPEAT_THRESHOLD", 5)
+    on_statement(_record_statement)
+
+    @app.before_request
+    def start_counting_queries():
+        if random.random() < sample_rate:
+            g.sql_queries = RequestQueries()
+
+    @app.after_request
+    def report_queries(response):
+        queries = g.get("sql_queries")
+        if queries is None:
+            return response
+        if response.is_streamed:
+            # a streamed page runs most of its queries while it's being sent,
+            # so they're reported once it has been, and there's no header
+            method, path = request.method, request.path
+            response.call_on_close(lambda: _report(queries, threshold, method, path))
+            return response
+        g.pop("sql_queries")
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries"',
+        )
+        _report(queries, threshold, request.method, request.path)
+        return response
+
+
+def _report(queries, threshold, method, path):
+    logger.info(
+        "%s %s: %d queries in %.1fms",
+        method,
+        path,
+        queries.count,
+        queries.duration * 1000,
+    )
+    for statement, count, sites in queries.repeated(threshold):
+        logger.warning(
+            "%s %s: statement run %d times, possible N+1 from %s\n%s",
+            method,
+            path,
+            count,
+            ", ".join(f"{site} ({n})" for site, n in sites.items()),
+            statement,
+        )
+
+
+def _record_statement(conn, statement, parameters, executemany, duration):
+    if has_request_context() and "sql_queries" in g:
+        g.sql_queries.record(statement, duration)
+
+
+def call_site():
+    # the innermost frame in application code, including compiled templates
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APPLICATION_DIR) and not filename.startswith(
+            MONITORING_DIR
+        ):
+            return (
+                f"{os.path.relpath(filename, APPLICATION_DIR)}:{frame.f_lineno} "
+                f"in {frame.f_code.co_name}"
+            )
+        frame = frame.f_back
+    return "unknown"
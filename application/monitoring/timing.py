@@ -0,0 +1,38 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# called with (conn, statement, parameters, executemany, duration) once each
+# statement has run, duration in seconds
+_subscribers = []
+
+
+def on_statement(subscriber):
+    """
+    Calls subscriber with the duration of every SQL statement run. One pair
+    of listeners times every statement for all the monitoring modules, and
+    the start time is kept on the statement's execution context, so a
+    statement that fails leaves nothing behind.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _start_timing):
+        event.listen(Engine, "before_cursor_execute", _start_timing)
+        event.listen(Engine, "after_cursor_execute", _publish_duration)
+    if subscriber not in _subscribers:
+        _subscribers.append(subscriber)
+
+
+def _start_timing(conn, cursor, statement, parameters, context, executemany):
+    # statements sqlalchemy runs for itself, such as on first connect, have
+    # no context and aren't timed
+    if context is not None:
+        context.statement_started = time.perf_counter()
+
+
+def _publish_duration(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "statement_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    for subscriber in _subscribers:
+        subscriber(conn, statement, parameters, executemany, duration)
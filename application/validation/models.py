@@ -20,6 +20,38 @@ def cross_dataset_reference_validator(dataset_name: str, value: str) -> str:
     return value
 
 
+def known_reference_validator(references: set, dataset_name: str, value: str) -> str:
+    # As above but against references loaded up front for a batch of records
+    if value.strip() == "":
+        return value
+    if value not in references:
+        raise ValueError(f"Reference '{value}' not found in dataset '{dataset_name}'")
+    return value
+
+
+def batch_context(dataset, rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Loads the dataset names and any referenced records needed to validate
+    a batch of rows for a dataset in two queries, rather than per record.
+    Pass the result as the context to RecordModel.from_data.
+    """
+    dataset_names = {d[0] for d in db.session.execute(select(Dataset.dataset))}
+    references = {}
+    for field in dataset.fields:
+        if field.field not in dataset_names:
+            continue
+        values = {
+            row[field.field]
+            for row in rows
+            if isinstance(row.get(field.field), str) and row[field.field].strip()
+        }
+        stmt = select(Record.reference).where(
+            Record.dataset_id == field.field, Record.reference.in_(values)
+        )
+        references[field.field] = set(db.session.execute(stmt).scalars())
+    return {"dataset_names": dataset_names, "references": references}
+
+
 class FieldModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     field: str
@@ -54,9 +86,15 @@ class RecordModel(BaseModel):
         # Get fields directly from the model instance
         valid_field_names = {field.field for field in model.fields}
 
+        # Use dataset names and references preloaded for a batch if we have them
+        context = info.context or {}
+        dataset_names = context.get("dataset_names")
+        references = context.get("references", {})
+
         # Get all dataset names
-        stmt = select(Dataset.dataset)
-        dataset_names = {d[0] for d in db.session.execute(stmt).fetchall()}
+        if dataset_names is None:
+            stmt = select(Dataset.dataset)
+            dataset_names = {d[0] for d in db.session.execute(stmt).fetchall()}
 
         # Check each key in data exists in the fields list and validate dataset references
         for key, val in model.data.items():
@@ -68,7 +106,10 @@ class RecordModel(BaseModel):
             # If the field name matches a dataset name, validate the reference
             if key in dataset_names and isinstance(val, str):
                 try:
-                    cross_dataset_reference_validator(key, val)
+                    if key in references:
+                        known_reference_validator(references[key], key, val)
+                    else:
+                        cross_dataset_reference_validator(key, val)
                 except ValueError as e:
                     raise ValueError(f"Invalid dataset reference: {str(e)}")
 
@@ -76,7 +117,10 @@ class RecordModel(BaseModel):
 
     @classmethod
     def from_data(
-        cls, form_data: dict[str, Any], fields: list[FieldModel]
+        cls,
+        form_data: dict[str, Any],
+        fields: list[FieldModel],
+        context: Optional[dict[str, Any]] = None,
     ) -> "RecordModel":
         # Extract and map form data to RecordModel
         data = {
@@ -99,12 +143,15 @@ class RecordModel(BaseModel):
             {"organisation": org}
             for org in form_data.get("organisations", "").split(";")
         ]
-        return cls(
-            name=name,
-            description=description,
-            notes=notes,
-            data=data,
-            organisation=organisation,
-            organisations=organisations,
-            fields=fields,
+        return cls.model_validate(
+            {
+                "name": name,
+                "description": description,
+                "notes": notes,
+                "data": data,
+                "organisation": organisation,
+                "organisations": organisations,
+                "fields": fields,
+            },
+            context=context,
         )
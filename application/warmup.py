@@ -0,0 +1,54 @@
+import logging
+import time
+
+from jinja2 import TemplateError
+from sqlalchemy.orm import configure_mappers, selectinload
+
+from application.database.models import (
+    CategoryValue,
+    Dataset,
+    Organisation,
+    Specification,
+)
+from application.database.serialise import record_serialiser
+from application.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up(app):
+    """
+    Does the work the first requests to a new worker would otherwise do:
+    sets up the model mappers, opens a database connection, runs the
+    specification and form choice queries so their SQL is compiled and
+    cached, builds the record serialisers, imports the geometry libraries
+    and compiles every template. Called from gunicorn's post_worker_init
+    when WARM_UP is set.
+    """
+    started = time.monotonic()
+    with app.app_context():
+        configure_mappers()
+        Specification.query.one_or_none()
+        for dataset in Dataset.query.options(selectinload(Dataset.fields)):
+            record_serialiser(tuple(field.field for field in dataset.ordered_fields()))
+        CategoryValue.query.all()
+        Organisation.query.order_by(Organisation.name).all()
+        db.session.remove()
+
+    # only imported once a geometry is checked, see forms.geometry_check
+    import geojson  # noqa
+    import shapely.wkt  # noqa
+
+    templates = 0
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        try:
+            app.jinja_env.get_template(name)
+            templates += 1
+        except TemplateError as e:
+            logger.warning("Could not compile %s: %s", name, e)
+
+    logger.info(
+        "Warmed up in %.1fs, %d templates compiled",
+        time.monotonic() - started,
+        templates,
+    )
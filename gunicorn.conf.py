@@ -0,0 +1,17 @@
+import os
+
+
+def child_exit(server, worker):
+    # drop the metrics of a worker that has gone from the totals /metrics reports
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # load and compile what the first requests need before taking traffic
+    if os.getenv("WARM_UP", "false").lower() == "true":
+        from application.warmup import warm_up
+
+        warm_up(worker.wsgi)
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+# the benchmarks drop and recreate every table in this database
+BENCHMARK_DATABASE_URL = os.getenv("BENCHMARK_DATABASE_URL")
+
+# number of parent records to benchmark against, each has one child record
+BENCHMARK_SIZES = [
+    int(size) for size in os.getenv("BENCHMARK_SIZES", "1000").split(",") if size
+]
+
+if BENCHMARK_DATABASE_URL is None:
+    collect_ignore_glob = ["test_*.py"]
+
+
+@pytest.fixture(scope="session")
+def app():
+    os.environ["DATABASE_URL"] = BENCHMARK_DATABASE_URL
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    from application.extensions import db
+    from application.factory import create_app
+    from tests.benchmarks.synthetic import create_specification
+
+    app = create_app("application.config.TestConfig")
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        create_specification()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="session", params=sorted(BENCHMARK_SIZES), ids=str)
+def size(app, request):
+    from tests.benchmarks.synthetic import add_records
+
+    # sizes run smallest first, so each only adds the records it is missing
+    add_records(request.param)
+    return request.param
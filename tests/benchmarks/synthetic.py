@@ -0,0 +1,146 @@
+"""
+Builds a synthetic specification for benchmarking.
+
+The specification has a parent dataset and a child dataset linked to it,
+with category, organisation, date, geometry and free text fields, so the
+benchmarks exercise the same lookups as a real specification.
+"""
+
+from sqlalchemy import func, text
+
+from application.blueprints.dataset.utils import entity_sequence_name
+from application.database.models import (
+    Category,
+    CategoryValue,
+    Dataset,
+    Field,
+    Organisation,
+    Record,
+    Specification,
+)
+from application.extensions import db
+from application.importer.synthetic import SyntheticData
+
+SPECIFICATION = "benchmark"
+PARENT = "benchmark-area"
+CHILD = "benchmark-feature"
+CATEGORY = "benchmark-type"
+
+CATEGORY_VALUES = 20
+ORGANISATIONS = 50
+ENTITY_RANGE = 10_000_000
+
+COMMON_FIELDS = [
+    ("entity", "integer"),
+    ("prefix", "string"),
+    ("reference", "string"),
+    ("name", "string"),
+    ("description", "text"),
+    ("notes", "text"),
+    ("entry-date", "datetime"),
+    ("start-date", "datetime"),
+    ("end-date", "datetime"),
+    ("organisation", "curie"),
+]
+PARENT_FIELDS = [
+    ("geometry", "multipolygon"),
+    ("documentation-url", "url"),
+    ("made-date", "datetime"),
+]
+CHILD_FIELDS = [
+    (PARENT, "string"),
+    (CATEGORY, "string"),
+    ("point", "point"),
+    ("height", "string"),
+]
+
+
+def create_specification():
+    """
+    Adds the synthetic specification, its category values and organisations
+    to an empty database
+    """
+    for dataset in [PARENT, CHILD]:
+        db.session.execute(
+            text(f"DROP SEQUENCE IF EXISTS {entity_sequence_name(dataset)}")
+        )
+
+    category = Category(reference=CATEGORY, name="Benchmark type")
+    db.session.add(category)
+    for i in range(CATEGORY_VALUES):
+        db.session.add(
+            CategoryValue(
+                prefix=CATEGORY,
+                reference=f"type-{i}",
+                name=f"Type {i}",
+                category=category,
+            )
+        )
+    for i in range(ORGANISATIONS):
+        db.session.add(
+            Organisation(
+                organisation=f"local-authority:BM{i:03}",
+                name=f"Benchmark council {i}",
+                entity=900000 + i,
+            )
+        )
+
+    fields = {}
+    for field, datatype in COMMON_FIELDS + PARENT_FIELDS + CHILD_FIELDS:
+        fields[field] = Field(
+            field=field,
+            name=field.replace("-", " ").capitalize(),
+            datatype=datatype,
+            category_reference=CATEGORY if field == CATEGORY else None,
+        )
+        db.session.add(fields[field])
+
+    specification = Specification(specification=SPECIFICATION, name="Benchmark")
+    db.session.add(specification)
+    parent = Dataset(
+        dataset=PARENT,
+        specification=specification,
+        entity_minimum=ENTITY_RANGE,
+        entity_maximum=2 * ENTITY_RANGE - 1,
+        fields=[fields[f] for f, _ in COMMON_FIELDS + PARENT_FIELDS],
+    )
+    child = Dataset(
+        dataset=CHILD,
+        specification=specification,
+        parent_dataset=parent,
+        entity_minimum=2 * ENTITY_RANGE,
+        entity_maximum=3 * ENTITY_RANGE - 1,
+        fields=[fields[f] for f, _ in COMMON_FIELDS + CHILD_FIELDS],
+    )
+    db.session.add_all([parent, child])
+    db.session.flush()
+    for dataset in [parent, child]:
+        db.session.execute(
+            text(
+                f"CREATE SEQUENCE {entity_sequence_name(dataset.dataset)} "
+                f"START WITH {dataset.entity_minimum} "
+                f"MINVALUE {dataset.entity_minimum} "
+                f"MAXVALUE {dataset.entity_maximum} NO CYCLE"
+            )
+        )
+    db.session.commit()
+    return specification
+
+
+def record_count(dataset):
+    return (
+        db.session.query(func.count(Record.entity))
+        .filter(Record.dataset_id == dataset)
+        .scalar()
+    )
+
+
+def add_records(count, seed=0):
+    """
+    Tops each dataset up to count records with the same generator as the
+    generate-data command
+    """
+    missing = count - record_count(PARENT)
+    if missing > 0:
+        specification = db.session.get(Specification, SPECIFICATION)
+        SyntheticData(specification, seed=seed + count).generate(missing)
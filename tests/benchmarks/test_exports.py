@@ -0,0 +1,45 @@
+from io import BytesIO
+
+from application.blueprints.main.utils import write_specification_zip
+from application.database.models import Specification
+from application.extensions import db
+from tests.benchmarks.synthetic import CHILD, PARENT
+
+# exports of the larger sizes take long enough that a few rounds will do
+ROUNDS = 3
+
+
+def _get(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.data
+
+
+def test_parent_csv(benchmark, client, size):
+    benchmark.pedantic(
+        _get,
+        args=(client, f"/dataset/{PARENT}.csv"),
+        setup=db.session.expunge_all,
+        rounds=ROUNDS,
+    )
+
+
+def test_child_csv(benchmark, client, size):
+    benchmark.pedantic(
+        _get,
+        args=(client, f"/dataset/{CHILD}.csv"),
+        setup=db.session.expunge_all,
+        rounds=ROUNDS,
+    )
+
+
+def test_specification_zip(benchmark, size):
+    def export():
+        db.session.expunge_all()
+        write_specification_zip(Specification.query.one(), BytesIO())
+
+    benchmark.pedantic(export, rounds=ROUNDS)
+
+
+def test_records_json_page(benchmark, client, size):
+    benchmark(_get, client, f"/dataset/{PARENT}/records.json?limit=100")
@@ -0,0 +1,72 @@
+from application.database.models import Dataset, Record
+from application.extensions import db
+from application.forms.builder import FormBuilder
+from application.validation.models import RecordModel, batch_context
+from tests.benchmarks.synthetic import CHILD, PARENT
+
+SAMPLE_SIZE = 100
+ROUNDS = 20
+
+
+def _load_sample(dataset):
+    # start each round from an empty session, as a request would
+    db.session.expunge_all()
+    records = (
+        Record.query.filter(Record.dataset_id == dataset)
+        .order_by(Record.entity)
+        .limit(SAMPLE_SIZE)
+        .all()
+    )
+    return (records,), {}
+
+
+def _form_data(record):
+    data = record.to_dict()
+    for field in ["entity", "prefix", "reference", "entry-date", "start-date"]:
+        data.pop(field, None)
+    data.pop("end-date", None)
+    return {key: value for key, value in data.items() if value is not None}
+
+
+def test_parent_to_dict(benchmark, size):
+    benchmark.pedantic(
+        lambda records: [record.to_dict() for record in records],
+        setup=lambda: _load_sample(PARENT),
+        rounds=ROUNDS,
+    )
+
+
+def test_child_to_dict(benchmark, size):
+    benchmark.pedantic(
+        lambda records: [record.to_dict() for record in records],
+        setup=lambda: _load_sample(CHILD),
+        rounds=ROUNDS,
+    )
+
+
+def test_form_builder_build(benchmark, app, size):
+    dataset = db.session.get(Dataset, CHILD)
+    record = Record.query.filter(Record.dataset_id == CHILD).first()
+    with app.test_request_context():
+        benchmark(lambda: FormBuilder(dataset.fields, obj=record).build())
+
+
+def test_record_model_validation(benchmark, size):
+    dataset = db.session.get(Dataset, CHILD)
+    (records,), _ = _load_sample(CHILD)
+    rows = [_form_data(record) for record in records]
+    fields = list(dataset.fields)
+    benchmark(lambda: [RecordModel.from_data(row, fields) for row in rows])
+
+
+def test_record_model_batch_validation(benchmark, size):
+    dataset = db.session.get(Dataset, CHILD)
+    (records,), _ = _load_sample(CHILD)
+    rows = [_form_data(record) for record in records]
+    fields = list(dataset.fields)
+
+    def validate():
+        context = batch_context(dataset, rows)
+        return [RecordModel.from_data(row, fields, context=context) for row in rows]
+
+    benchmark(validate)
@@ -0,0 +1,99 @@
+import os
+import time
+
+import pytest
+
+from application.importer import cache
+from application.importer.cache import CacheMiss, ResponseCache
+
+URL = "https://datasette.example.com/digital-land/field.json"
+
+
+class Fetcher:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def __call__(self, url):
+        self.urls.append(url)
+        return self.responses.pop(0)
+
+
+def test_responses_are_reused_until_they_expire(tmp_path, monkeypatch):
+    responses = ResponseCache(str(tmp_path), ttl=60)
+    fetch = Fetcher([{"field": "name"}], [{"field": "notes"}])
+
+    assert responses.get(URL, fetch) == [{"field": "name"}]
+    assert responses.get(URL, fetch) == [{"field": "name"}]
+    assert len(fetch.urls) == 1
+
+    later = time.time() + 61
+    monkeypatch.setattr(cache.time, "time", lambda: later)
+    assert responses.get(URL, fetch) == [{"field": "notes"}]
+    assert len(fetch.urls) == 2
+
+
+def test_a_ttl_of_zero_always_fetches(tmp_path):
+    responses = ResponseCache(str(tmp_path))
+    fetch = Fetcher([1], [2])
+
+    responses.get(URL, fetch)
+    assert responses.get(URL, fetch, ttl=0) == [2]
+
+
+def test_offline_reads_cached_responses_however_old(tmp_path, monkeypatch):
+    ResponseCache(str(tmp_path)).get(URL, Fetcher(["cached"]))
+    later = time.time() + 365 * 86400
+    monkeypatch.setattr(cache.time, "time", lambda: later)
+
+    offline = ResponseCache(str(tmp_path), offline=True)
+    assert offline.get(URL, Fetcher()) == ["cached"]
+
+
+def test_offline_fails_on_a_cache_miss(tmp_path):
+    offline = ResponseCache(str(tmp_path), offline=True, enabled=False)
+    fetch = Fetcher()
+
+    with pytest.raises(CacheMiss):
+        offline.get(URL, fetch)
+    assert fetch.urls == []
+
+
+def test_identical_responses_share_an_object(tmp_path):
+    responses = ResponseCache(str(tmp_path))
+    responses.get(URL, Fetcher([]))
+    responses.get(f"{URL}?_size=max", Fetcher([]))
+
+    assert len(os.listdir(tmp_path / "urls")) == 2
+    assert len(os.listdir(tmp_path / "objects")) == 1
+
+
+def test_a_failed_write_leaves_nothing_behind(tmp_path, monkeypatch):
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache.os, "replace", fail)
+    path = tmp_path / "objects" / "digest"
+
+    with pytest.raises(OSError):
+        cache._atomic_write(str(path), b"{}")
+    assert os.listdir(tmp_path / "objects") == []
+
+
+def test_writes_use_a_temporary_file_each(tmp_path, monkeypatch):
+    # two threads writing the same object mustn't share a temporary file
+    paths = []
+    replace = os.replace
+
+    def record(src, dst):
+        paths.append(src)
+        replace(src, dst)
+
+    monkeypatch.setattr(cache.os, "replace", record)
+    path = str(tmp_path / "objects" / "digest")
+    cache._atomic_write(path, b"1")
+    cache._atomic_write(path, b"2")
+
+    assert len(set(paths)) == 2
+    assert all(os.path.dirname(p) == os.path.dirname(path) for p in paths)
+    assert (tmp_path / "objects" / "digest").read_bytes() == b"2"
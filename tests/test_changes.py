@@ -0,0 +1,63 @@
+import pytest
+from flask import Flask
+from sqlalchemy.dialects import postgresql
+
+from application.blueprints.api.views import _change_position, _changes_query, api
+from application.extensions import db
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", AUTHENTICATION_ON=False)
+    db.init_app(app)
+    app.register_blueprint(api, url_prefix="/api")
+    with app.app_context():
+        yield app
+
+
+def _sql(query):
+    return str(
+        query.statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "since, position",
+    [("0", None), ("812-14", (812, 14)), ("9007199254740993-1", (2**53 + 1, 1))],
+)
+def test_cursors_are_a_txid_and_an_id(since, position):
+    assert _change_position(since) == position
+
+
+@pytest.mark.parametrize("since", ["", "14", "812-", "-14", "812-x", "a-b"])
+def test_malformed_cursors_are_rejected(since):
+    with pytest.raises(ValueError):
+        _change_position(since)
+
+
+def test_a_malformed_cursor_is_a_bad_request(app):
+    response = app.test_client().get("/api/changes.ndjson?since=812")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor 812"}
+
+
+def test_only_changes_older_than_running_transactions_are_read(app):
+    sql = _sql(_changes_query(None, None, 10))
+
+    assert (
+        "record_change.txid < (SELECT txid_snapshot_xmin(txid_current_snapshot())"
+        in sql
+    )
+    assert "ORDER BY record_change.txid, record_change.id" in sql
+    assert "LIMIT 10" in sql
+
+
+def test_changes_are_read_after_the_cursor(app):
+    sql = _sql(_changes_query((812, 14), "tree", 10))
+
+    assert "(record_change.txid, record_change.id) > (812, 14)" in sql
+    assert "record_change.dataset_id = 'tree'" in sql
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import pytest
+
+from application.blueprints.dataset import utils
+from application.blueprints.dataset.utils import (
+    ENTITY_BLOCK_SIZE,
+    ENTITY_POOL_MINIMUM,
+    EntityAllocator,
+    reserve_entities,
+)
+
+DATASET = SimpleNamespace(dataset="tree", entity_minimum=1, entity_maximum=None)
+
+
+class Sequence:
+    """Stands in for a dataset's entity sequence, with its nextval calls"""
+
+    def __init__(self, remaining, start=1):
+        self.remaining = remaining
+        self.next_value = start
+        self.reserved = []
+
+    def reserve(self, dataset, count):
+        if count > self.remaining:
+            raise ValueError(f"Only {self.remaining} entity ids left")
+        self.reserved.append(count)
+        entities = list(range(self.next_value, self.next_value + count))
+        self.next_value += count
+        self.remaining -= count
+        return entities
+
+
+@pytest.fixture
+def sequence(monkeypatch):
+    def use(remaining):
+        sequence = Sequence(remaining)
+        monkeypatch.setattr(utils, "remaining_entities", lambda d: sequence.remaining)
+        monkeypatch.setattr(utils, "reserve_entities", sequence.reserve)
+        return sequence
+
+    return use
+
+
+def test_single_records_take_a_block_of_ids(sequence):
+    ids = sequence(ENTITY_POOL_MINIMUM * 10)
+    allocator = EntityAllocator()
+
+    entities = [allocator.next(DATASET) for _ in range(ENTITY_BLOCK_SIZE + 1)]
+
+    assert entities == list(range(1, ENTITY_BLOCK_SIZE + 2))
+    assert ids.reserved == [ENTITY_BLOCK_SIZE, ENTITY_BLOCK_SIZE]
+
+
+def test_bulk_allocations_take_what_they_need(sequence):
+    ids = sequence(ENTITY_POOL_MINIMUM * 10)
+    allocator = EntityAllocator()
+
+    assert allocator.allocate(DATASET, 3) == [1, 2, 3]
+    assert ids.reserved == [3]
+
+
+def test_single_records_take_one_id_near_the_end_of_the_range(sequence):
+    ids = sequence(ENTITY_POOL_MINIMUM)
+    allocator = EntityAllocator()
+
+    assert [allocator.next(DATASET) for _ in range(3)] == [1, 2, 3]
+    assert ids.reserved == [1, 1, 1]
+
+
+def test_allocating_past_the_end_of_the_range_fails(sequence):
+    ids = sequence(2)
+    allocator = EntityAllocator()
+
+    assert [allocator.next(DATASET) for _ in range(2)] == [1, 2]
+    with pytest.raises(ValueError):
+        allocator.next(DATASET)
+    with pytest.raises(ValueError):
+        allocator.allocate(DATASET, 3)
+    assert ids.reserved == [1, 1]
+
+
+def test_reserving_more_ids_than_are_left_fails_before_nextval(monkeypatch):
+    monkeypatch.setattr(utils, "remaining_entities", lambda dataset: 5)
+
+    # outside an app context any query would fail with a RuntimeError
+    with pytest.raises(ValueError, match="Only 5 entity ids left for tree"):
+        reserve_entities(DATASET, 6)
@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+from jinja2 import DictLoader
+
+from application import fragments
+from application.fragments import FragmentCache, record_fragment
+
+CARD = "{{ record.name }}"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fragments.time, "monotonic", clock)
+    return clock
+
+
+def test_the_least_recently_used_entry_is_dropped():
+    cache = FragmentCache(maxsize=2, ttl=60)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.get("a")
+    cache.set("c", "C")
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("A", None, "C")
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = FragmentCache(maxsize=10, ttl=60)
+    cache.set("a", "A")
+
+    clock.now += 60
+    assert cache.get("a") == "A"
+    clock.now += 1
+    assert cache.get("a") is None
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["FRAGMENT_CACHE_SIZE"] = 10
+    app.jinja_loader = DictLoader({"card.html": CARD})
+    fragments.init_app(app)
+    return app
+
+
+@pytest.fixture
+def record():
+    field = SimpleNamespace(
+        field="name",
+        name="Name",
+        datatype="string",
+        cardinality="1",
+        category_reference=None,
+    )
+    dataset = SimpleNamespace(
+        dataset="tree", name="Tree", parent_dataset=None, fields=[field]
+    )
+    dataset.ordered_fields = lambda: dataset.fields
+    return SimpleNamespace(
+        dataset_id="tree", entity=1, version=7, dataset=dataset, name="Oak"
+    )
+
+
+def _render(app, record):
+    # a request each, as the schema version is worked out once per request
+    with app.test_request_context():
+        return str(record_fragment("card.html", record))
+
+
+def test_fragments_are_reused_for_the_same_version(app, record):
+    assert _render(app, record) == "Oak"
+    record.name = "Ash"
+    assert _render(app, record) == "Oak"
+
+
+def test_a_new_record_version_renders_again(app, record):
+    _render(app, record)
+    record.name = "Ash"
+    record.version = 8
+
+    assert _render(app, record) == "Ash"
+
+
+def test_a_change_to_the_dataset_fields_renders_again(app, record):
+    _render(app, record)
+    record.name = "Ash"
+    record.dataset.fields[0].name = "Tree name"
+
+    assert _render(app, record) == "Ash"
+
+
+def test_nothing_is_cached_with_a_size_of_zero(app, record):
+    app.config["FRAGMENT_CACHE_SIZE"] = 0
+    fragments.init_app(app)
+
+    _render(app, record)
+    record.name = "Ash"
+    assert _render(app, record) == "Ash"
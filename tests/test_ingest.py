@@ -0,0 +1,82 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from application.blueprints.dataset import utils
+from application.blueprints.dataset.ingest import RecordIngest, map_columns, read_csv
+from application.extensions import db
+
+FIELDS = [
+    SimpleNamespace(field="name", name="Name", datatype="string"),
+    SimpleNamespace(field="notes", name="Notes", datatype="text"),
+]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        # only the dataset names are read to validate a batch of new records
+        db.session.execute(text("CREATE TABLE dataset (dataset TEXT)"))
+        db.session.execute(text("INSERT INTO dataset VALUES ('tree')"))
+        yield app
+
+
+@pytest.fixture
+def dataset():
+    dataset = SimpleNamespace(dataset="tree", parent=None, fields=FIELDS)
+    yield dataset
+    utils.entity_allocator.reset(dataset)
+
+
+def test_rows_fail_when_the_entity_range_is_used_up(app, dataset, monkeypatch):
+    monkeypatch.setattr(utils, "remaining_entities", lambda dataset: 0)
+    ingest = RecordIngest(dataset)
+
+    rows = [(2, {"name": "Oak"}), (3, {"name": "Ash"}), (4, ValueError("bad row"))]
+    results = list(ingest.ingest(rows))
+
+    assert [result["status"] for result in results] == ["failed"] * 3
+    assert results[0]["errors"] == [
+        "Batch could not be saved: Only 0 entity ids left for tree, 2 are needed"
+    ]
+    assert results[2]["errors"] == ["bad row"]
+    assert ingest.counts == {"created": 0, "updated": 0, "failed": 3}
+
+
+def test_columns_match_fields_by_field_or_name():
+    headers = ["Name", "NOTES", "owning_record", "colour"]
+
+    columns, unmatched = map_columns(headers, FIELDS)
+
+    assert columns == {
+        "Name": "name",
+        "NOTES": "notes",
+        "owning_record": "owning_record",
+    }
+    assert unmatched == ["colour"]
+
+
+def test_a_csv_is_read_as_numbered_rows():
+    # as saved by excel, with a byte order mark
+    stream = io.BytesIO("\ufeffname,colour,Notes\nOak,green,old\nAsh,,\n".encode())
+
+    columns, unmatched, rows = read_csv(stream, FIELDS)
+
+    assert columns == {"name": "name", "Notes": "notes"}
+    assert unmatched == ["colour"]
+    assert list(rows) == [
+        (2, {"name": "Oak", "notes": "old"}),
+        (3, {"name": "Ash", "notes": ""}),
+    ]
+
+
+def test_an_empty_csv_has_no_columns():
+    columns, unmatched, rows = read_csv(io.BytesIO(b""), FIELDS)
+
+    assert (columns, unmatched, list(rows)) == ({}, [], [])
@@ -0,0 +1,111 @@
+import logging
+
+import pytest
+from flask import Flask
+from jinja2 import DictLoader
+from sqlalchemy import create_engine, text
+
+from application.blueprints.dataset.views import _render_listing
+from application.extensions import db
+from application.monitoring import metrics, sql
+
+# enough rows that the page is sent in more than one chunk
+ROWS = 2000
+
+LISTING = (
+    "<h1>{{ record_count }} records</h1>"
+    "{% for record in records %}<p>{{ record.name }}</p>{% endfor %}"
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE record (entity INTEGER, name TEXT)"))
+        conn.execute(
+            text("INSERT INTO record VALUES (:entity, :name)"),
+            [{"entity": n, "name": f"record {n}"} for n in range(ROWS)],
+        )
+    return engine
+
+
+@pytest.fixture
+def app(engine):
+    app = Flask(__name__)
+    app.config.update(SQL_INSTRUMENTATION=True, STREAM_LISTINGS=True)
+    app.jinja_loader = DictLoader({"listing.html": LISTING})
+    sql.init_app(app)
+    metrics.init_app(app)
+
+    def records():
+        # the rows are read as the page is rendered, as _listed_records does
+        with engine.connect() as conn:
+            yield from conn.execute(text("SELECT name FROM record ORDER BY entity"))
+
+    @app.route("/listing")
+    def listing():
+        with engine.connect() as conn:
+            count = conn.execute(text("SELECT count(*) FROM record")).scalar()
+        return _render_listing("listing.html", records=records(), record_count=count)
+
+    return app
+
+
+def _observed(histogram, **labels):
+    return histogram.labels(**labels)._sum.get()
+
+
+def test_streamed_listing_queries_are_counted(app, caplog):
+    labels = {"endpoint": "listing", "method": "GET", "status": 200}
+    latency = _observed(metrics.REQUEST_LATENCY, **labels)
+    db_time = _observed(metrics.DB_TIME, endpoint="listing")
+    with caplog.at_level(logging.INFO, logger="application.monitoring.sql"):
+        response = app.test_client().get("/listing")
+        assert response.get_data(as_text=True).count("<p>") == ROWS
+        # as the wsgi server does once the page has been sent
+        response.close()
+
+    # the count and the query run while the page was sent
+    assert "GET /listing: 2 queries" in caplog.text
+    assert "Server-Timing" not in response.headers
+    assert _observed(metrics.REQUEST_LATENCY, **labels) > latency
+    assert _observed(metrics.DB_TIME, endpoint="listing") > db_time
+
+
+def test_rendered_listing_queries_are_counted(app, caplog):
+    app.config["STREAM_LISTINGS"] = False
+    with caplog.at_level(logging.INFO, logger="application.monitoring.sql"):
+        response = app.test_client().get("/listing")
+
+    assert "GET /listing: 2 queries" in caplog.text
+    assert 'desc="2 queries"' in response.headers["Server-Timing"]
+
+
+@pytest.fixture
+def secured(app):
+    app.config.update(
+        AUTHENTICATION_ON=True,
+        API_TOKENS=["secret"],
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+    )
+    # entity headroom is left out of the figures as sqlite has no sequences
+    db.init_app(app)
+    return app
+
+
+def test_metrics_need_a_token(secured):
+    client = secured.test_client()
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+
+def test_metrics_are_shown_with_a_token(secured):
+    response = secured.test_client().get(
+        "/metrics", headers={"Authorization": "Bearer secret"}
+    )
+
+    assert response.status_code == 200
+    assert "app_request_duration_seconds" in response.get_data(as_text=True)
@@ -0,0 +1,43 @@
+import pytest
+
+from application.importer.sources import IN_QUERY_SIZE, DatasetteSource
+
+DB_URL = "https://datasette.example.com/digital-land"
+
+
+class FetchError(Exception):
+    pass
+
+
+def _skipping_get(url):
+    # as commands._get does, a failed request reads as no rows
+    return []
+
+
+def test_lookups_are_fetched_in_chunks():
+    urls = []
+
+    def get(url):
+        urls.append(url)
+        return [
+            {"field": key} for key in url.split("__in=")[1].split("&")[0].split(",")
+        ]
+
+    source = DatasetteSource(_skipping_get, DB_URL, get_or_raise=get)
+    keys = [f"field-{n:03}" for n in range(IN_QUERY_SIZE + 1)]
+
+    assert sorted(source.get_fields(keys)) == keys
+    assert len(urls) == 2
+
+
+def test_a_failed_chunk_stops_the_lookup():
+    def get(url):
+        if "field-100" in url:
+            raise FetchError(url)
+        return []
+
+    source = DatasetteSource(_skipping_get, DB_URL, get_or_raise=get)
+    keys = [f"field-{n:03}" for n in range(IN_QUERY_SIZE + 1)]
+
+    with pytest.raises(FetchError):
+        source.get_fields(keys)
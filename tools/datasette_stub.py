@@ -0,0 +1,204 @@
+"""
+A local stand-in for the planning data datasette and the dataset editor.
+
+Serves the json endpoints the import commands use from a directory of
+fixtures, so imports can be run, profiled and benchmarked without the
+network:
+
+    fixtures/digital-land.sqlite3     specification, field, dataset and
+                                      organisation tables
+    fixtures/<dataset>.sqlite3        an entity table for each dataset
+    fixtures/dataset/<category>.json  dataset editor category values
+
+Any fixture file matching the request path is returned as it is, otherwise
+/<database>/<table>.json is answered from the table with datasette's
+column__op filters, _sort, _size and _shape, and /<database>.json?sql= runs
+the query. The sqlite files can be downloaded from the platform.
+
+    python tools/datasette_stub.py fixtures --port 8001 --latency 200 --failure-rate 0.05
+    DATASETTE_URL=http://localhost:8001 DATASET_EDITOR_URL=http://localhost:8001 \\
+        flask specification init tree-preservation-order
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+
+from flask import Flask, Response, abort, jsonify, request
+
+DEFAULT_SIZE = 100
+MAX_SIZE = 1000
+NAME = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+OPERATORS = {
+    "exact": "= ?",
+    "not": "!= ?",
+    "gt": "> ?",
+    "gte": ">= ?",
+    "lt": "< ?",
+    "lte": "<= ?",
+    "contains": "LIKE '%' || ? || '%'",
+    "startswith": "LIKE ? || '%'",
+}
+
+
+def create_stub(fixtures, latency=0, jitter=0, failure_rate=0.0, failure_status=503):
+    app = Flask(__name__)
+    fixtures = os.path.abspath(fixtures)
+
+    @app.before_request
+    def inject_latency_and_failures():
+        delay = latency + random.uniform(0, jitter)
+        if delay:
+            time.sleep(delay / 1000)
+        if failure_rate and random.random() < failure_rate:
+            return jsonify({"ok": False, "error": "Injected failure"}), failure_status
+
+    @app.route("/<path:path>")
+    def serve(path):
+        fixture = os.path.abspath(os.path.join(fixtures, path))
+        if not fixture.startswith(fixtures + os.sep):
+            abort(404)
+        if os.path.isfile(fixture):
+            with open(fixture, "rb") as f:
+                return Response(f.read(), mimetype="application/json")
+
+        parts = path.removesuffix(".json").split("/")
+        if not path.endswith(".json") or not all(NAME.match(p) for p in parts):
+            abort(404)
+        if len(parts) == 1:
+            sql = request.args.get("sql")
+            if not sql:
+                abort(404)
+            return _respond(*_query(_connect(fixtures, parts[0]), sql, []))
+        if len(parts) == 2:
+            return _respond(*_table(_connect(fixtures, parts[0]), parts[1]))
+        abort(404)
+
+    return app
+
+
+def _connect(fixtures, database):
+    path = os.path.join(fixtures, f"{database}.sqlite3")
+    if not os.path.isfile(path):
+        abort(404)
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def _table(connection, table):
+    columns = [
+        row["name"] for row in connection.execute(f'PRAGMA table_info("{table}")')
+    ]
+    if not columns:
+        abort(404)
+
+    where = []
+    params = []
+    for key, value in request.args.items(multi=True):
+        if key.startswith("_") or key == "sql":
+            continue
+        column, _, op = key.partition("__")
+        op = op or "exact"
+        if column not in columns:
+            abort(400, f"No column {column}")
+        if op == "in":
+            values = [_value(v) for v in value.split(",")]
+            where.append(f'"{column}" IN ({",".join("?" for _ in values)})')
+            params.extend(values)
+        elif op == "isblank":
+            where.append(f'("{column}" IS NULL OR "{column}" = \'\')')
+        elif op == "notblank":
+            where.append(f'("{column}" IS NOT NULL AND "{column}" != \'\')')
+        elif op in OPERATORS:
+            where.append(f'"{column}" {OPERATORS[op]}')
+            params.append(_value(value))
+        else:
+            abort(400, f"Unsupported filter {key}")
+
+    sql = f'SELECT * FROM "{table}"'
+    if where:
+        sql = f"{sql} WHERE {' AND '.join(where)}"
+    sort = request.args.get("_sort")
+    sort_desc = request.args.get("_sort_desc")
+    if sort in columns:
+        sql = f'{sql} ORDER BY "{sort}"'
+    elif sort_desc in columns:
+        sql = f'{sql} ORDER BY "{sort_desc}" DESC'
+    else:
+        sql = f"{sql} ORDER BY rowid"
+    size = request.args.get("_size", str(DEFAULT_SIZE))
+    if size != "max":
+        sql = f"{sql} LIMIT {min(int(size), MAX_SIZE) if size.isdigit() else DEFAULT_SIZE}"
+    return _query(connection, sql, params)
+
+
+def _query(connection, sql, params):
+    try:
+        cursor = connection.execute(sql, params)
+    except sqlite3.Error as e:
+        abort(400, str(e))
+    columns = [column[0] for column in cursor.description or []]
+    rows = [tuple(row) for row in cursor]
+    connection.close()
+    return columns, rows
+
+
+def _respond(columns, rows):
+    # datasette's default shape is lists of values, _shape=array gives objects
+    shape = request.args.get("_shape")
+    if shape == "array":
+        body = [dict(zip(columns, row)) for row in rows]
+    elif shape == "objects":
+        body = {"rows": [dict(zip(columns, row)) for row in rows]}
+    else:
+        body = {"columns": columns, "rows": [list(row) for row in rows]}
+    return Response(json.dumps(body), mimetype="application/json")
+
+
+def _value(value):
+    # query string values are text, but ids are compared with integer columns
+    return int(value) if re.fullmatch(r"-?\d+", value) else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("fixtures", help="Directory of sqlite and json fixtures")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Milliseconds to wait per request"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0,
+        help="Up to this many more milliseconds, chosen at random per request",
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests to fail, for example 0.05",
+    )
+    parser.add_argument(
+        "--failure-status", type=int, default=503, help="Status code of failures"
+    )
+    args = parser.parse_args()
+    app = create_stub(
+        args.fixtures,
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+    )
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
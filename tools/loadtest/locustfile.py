@@ -0,0 +1,167 @@
+"""
+Load test scenarios for the dataset pages.
+
+Each simulated user browses a dataset, views and edits records, adds
+records and now and then downloads the csv export, in roughly the
+proportions people use the application. Run it against a local app
+loaded with synthetic data, either directly
+
+    locust -f tools/loadtest/locustfile.py --host http://localhost:8000 \\
+        --dataset tree-preservation-order
+
+or through tools/loadtest/run.py to compare gunicorn worker and thread
+settings. Requests are grouped by endpoint in the results, with the
+dataset and entity left out of the names.
+"""
+
+import random
+import sys
+import uuid
+from html.parser import HTMLParser
+
+import requests
+from locust import HttpUser, between, events, task
+from locust.exception import StopUser
+
+# entities picked from for the record view and edit scenarios
+SAMPLE_SIZE = 1000
+
+entities = []
+
+
+@events.init_command_line_parser.add_listener
+def add_arguments(parser):
+    parser.add_argument(
+        "--dataset",
+        env_var="LOADTEST_DATASET",
+        default="",
+        help="Dataset to run the scenarios against",
+    )
+
+
+@events.init.add_listener
+def check_arguments(environment, **kwargs):
+    if environment.parsed_options and not environment.parsed_options.dataset:
+        sys.exit("Set the dataset to test with --dataset")
+
+
+@events.test_start.add_listener
+def load_entities(environment, **kwargs):
+    dataset = environment.parsed_options.dataset
+    # read once before the users start, so it isn't counted in the results
+    response = requests.get(
+        f"{environment.host}/dataset/{dataset}/records.json",
+        params={"fields": "reference", "limit": SAMPLE_SIZE},
+    )
+    response.raise_for_status()
+    entities[:] = [record["entity"] for record in response.json()["records"]]
+
+
+class RecordFormParser(HTMLParser):
+    """
+    Collects the values a browser would submit from the record form,
+    including the csrf token
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.data = {}
+        self._in_form = False
+        self._textarea = None
+        self._select = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form":
+            self._in_form = attrs.get("method", "").lower() == "post"
+        if not self._in_form or "disabled" in attrs:
+            return
+        name = attrs.get("name")
+        if tag == "input" and name and attrs.get("type") not in ("submit", "button"):
+            self.data[name] = attrs.get("value") or ""
+        elif tag == "textarea" and name:
+            self._textarea = name
+            self.data[name] = ""
+        elif tag == "select" and name:
+            self._select = name
+        elif tag == "option" and self._select:
+            # like a browser, send the selected option or else the first
+            if self._select not in self.data or "selected" in attrs:
+                self.data[self._select] = attrs.get("value") or ""
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._in_form = False
+        elif tag == "textarea":
+            self._textarea = None
+        elif tag == "select":
+            self._select = None
+
+    def handle_data(self, data):
+        if self._textarea:
+            self.data[self._textarea] += data
+
+
+def form_data(html):
+    parser = RecordFormParser()
+    parser.feed(html)
+    return parser.data
+
+
+class DatasetUser(HttpUser):
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        self.dataset = self.environment.parsed_options.dataset
+        if not entities:
+            raise StopUser(f"No records found in {self.dataset}")
+
+    @task(4)
+    def browse(self):
+        self.client.get(f"/dataset/{self.dataset}", name="/dataset/[dataset]")
+        self.client.get(
+            f"/dataset/{self.dataset}/records", name="/dataset/[dataset]/records"
+        )
+
+    @task(8)
+    def view_record(self):
+        self.client.get(
+            f"/dataset/{self.dataset}/{random.choice(entities)}",
+            name="/dataset/[dataset]/[entity]",
+        )
+
+    @task(2)
+    def edit_record(self):
+        url = f"/dataset/{self.dataset}/{random.choice(entities)}/edit"
+        name = "/dataset/[dataset]/[entity]/edit"
+        response = self.client.get(url, name=name)
+        if not response.ok:
+            return
+        data = form_data(response.text)
+        data["name"] = f"Load test {uuid.uuid4().hex[:8]}"
+        self._submit(url, name, data)
+
+    @task(1)
+    def add_record(self):
+        url = f"/dataset/{self.dataset}/add"
+        name = "/dataset/[dataset]/add"
+        response = self.client.get(url, name=name)
+        if not response.ok:
+            return
+        data = form_data(response.text)
+        data["name"] = f"Load test {uuid.uuid4().hex[:8]}"
+        self._submit(url, name, data)
+
+    @task(1)
+    def export(self):
+        self.client.get(f"/dataset/{self.dataset}.csv", name="/dataset/[dataset].csv")
+
+    def _submit(self, url, name, data):
+        # a saved form redirects, a form shown again has failed validation
+        with self.client.post(
+            url, data=data, name=name, allow_redirects=False, catch_response=True
+        ) as response:
+            if response.status_code == 302:
+                response.success()
+            elif response.ok:
+                response.failure("Form was not accepted")
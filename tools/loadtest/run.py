@@ -0,0 +1,186 @@
+"""
+Runs the load test scenarios against the app under gunicorn once for each
+worker and thread setting, and reports throughput, latency percentiles and
+error rates per endpoint for each.
+
+The app is started from application.wsgi, or --app, with the environment of this
+process, so DATABASE_URL should point at a database loaded with synthetic
+data, for example with flask specification generate-data --count 100000.
+
+    python tools/loadtest/run.py --dataset tree-preservation-order \\
+        --workers 1,2,4 --threads 1,4 --users 50 --run-time 2m
+
+Locust's csv results for each run are kept in the output directory, along
+with summary.csv covering all of them.
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import time
+from itertools import product
+
+import requests
+
+LOCUSTFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locustfile.py")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(LOCUSTFILE)))
+
+# locust stats columns reported, with the headings used in the summary
+COLUMNS = {
+    "Request Count": "requests",
+    "Failure Count": "failures",
+    "Requests/s": "rps",
+    "50%": "p50",
+    "95%": "p95",
+    "99%": "p99",
+    "Max Response Time": "max",
+}
+STARTUP_TIMEOUT = 60
+
+
+def start_app(app, workers, threads, port):
+    env = {
+        "FLASK_CONFIG": "application.config.Config",
+        "SQL_INSTRUMENTATION": "false",
+        **os.environ,
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            "gunicorn.conf.py",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+            "--threads",
+            str(threads),
+            "--log-level",
+            "warning",
+            app,
+        ],
+        cwd=PROJECT_ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not start within {STARTUP_TIMEOUT} seconds")
+
+
+def run_locust(args, prefix):
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "locust",
+            "--locustfile",
+            LOCUSTFILE,
+            "--headless",
+            "--only-summary",
+            "--host",
+            f"http://127.0.0.1:{args.port}",
+            "--dataset",
+            args.dataset,
+            "--users",
+            str(args.users),
+            "--spawn-rate",
+            str(args.spawn_rate),
+            "--run-time",
+            args.run_time,
+            "--csv",
+            prefix,
+        ],
+        cwd=PROJECT_ROOT,
+    )
+    with open(f"{prefix}_stats.csv", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def summarise(workers, threads, stats):
+    rows = []
+    for stat in stats:
+        row = {
+            "workers": workers,
+            "threads": threads,
+            "method": stat["Type"],
+            "endpoint": stat["Name"],
+        }
+        row.update(
+            {name: round(float(stat[column])) for column, name in COLUMNS.items()}
+        )
+        row["rps"] = round(float(stat["Requests/s"]), 1)
+        requests_made = int(stat["Request Count"])
+        failures = int(stat["Failure Count"])
+        row["error_rate"] = f"{failures / requests_made:.2%}" if requests_made else ""
+        rows.append(row)
+    return rows
+
+
+def print_summary(rows):
+    headings = list(rows[0].keys())
+    widths = {
+        heading: max(len(heading), *(len(str(row[heading])) for row in rows))
+        for heading in headings
+    }
+    print("  ".join(heading.ljust(widths[heading]) for heading in headings))
+    for row in rows:
+        print(
+            "  ".join(str(row[heading]).ljust(widths[heading]) for heading in headings)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dataset", required=True)
+    parser.add_argument("--app", default="application.wsgi:app")
+    parser.add_argument(
+        "--workers", default="1,2,4", help="Comma separated gunicorn worker counts"
+    )
+    parser.add_argument(
+        "--threads", default="1,4", help="Comma separated gunicorn thread counts"
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--spawn-rate", type=float, default=10)
+    parser.add_argument("--run-time", default="1m")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--output", default=".loadtest")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    summary = []
+    for workers, threads in product(
+        [int(w) for w in args.workers.split(",")],
+        [int(t) for t in args.threads.split(",")],
+    ):
+        print(f"Running with {workers} workers and {threads} threads")
+        server = start_app(args.app, workers, threads, args.port)
+        try:
+            prefix = os.path.abspath(
+                os.path.join(args.output, f"w{workers}-t{threads}")
+            )
+            summary.extend(summarise(workers, threads, run_locust(args, prefix)))
+        finally:
+            server.terminate()
+            server.wait()
+
+    with open(os.path.join(args.output, "summary.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(summary[0].keys()))
+        writer.writeheader()
+        writer.writerows(summary)
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()